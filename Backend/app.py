@@ -4,23 +4,77 @@ import time
 import logging
 import importlib
 import sys
+import json
+import uuid
+import tempfile
+import math
+import random
+import hashlib
+import sqlite3
+import queue
+import threading
+import contextvars
+from contextlib import contextmanager
+import zlib
+import bisect
+import itertools
+import base64
+from array import array
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, FIRST_COMPLETED
+from concurrent.futures import wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import requests
+from requests.adapters import HTTPAdapter
+
+# Optional HTTP/2 transport (httpx with the h2 extra)
+try:
+    import httpx
+    import h2  # noqa: F401
+except Exception:
+    httpx = None
+
+# Optional cross-process locking (POSIX only); without it coalescing is per process
+try:
+    import fcntl
+except Exception:
+    fcntl = None
 
 # Optional PDF support
 try:
     import fitz  # PyMuPDF
 except Exception:
     fitz = None
+else:
+    # the extraction pool imports this small module, not the app
+    try:
+        from .pdf_extract import extract_pages
+    except ImportError:
+        from pdf_extract import extract_pages
+
+# Optional NumPy for the extractive pre-compression stage (mode=fast)
+try:
+    import numpy as np
+except Exception:
+    np = None
 
 # Try to import common youtube_transcript_api errors (if available)
 try:
     from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 except Exception:
     TranscriptsDisabled = NoTranscriptFound = VideoUnavailable = None
+# ...and the ones raised when YouTube refused or failed the request itself (names vary by library version)
+try:
+    from youtube_transcript_api import _errors as _yt_errors
+    YT_REQUEST_ERRORS = tuple(e for e in (getattr(_yt_errors, n, None) for n in
+                                          ("YouTubeRequestFailed", "TooManyRequests", "RequestBlocked", "IpBlocked")) if e is not None)
+except Exception:
+    YT_REQUEST_ERRORS = ()
 
 # Load environment
 load_dotenv()
@@ -29,6 +83,12 @@ HF_API_KEY = os.getenv("HF_API_KEY")
 HF_SUMMARY_MODEL = os.getenv("HF_SUMMARY_MODEL", "sshleifer/distilbart-cnn-12-6")
 # fallback translation model name pattern: Helsinki-NLP/opus-mt-<src>-en
 TRANSLATION_MODEL_TEMPLATE = "Helsinki-NLP/opus-mt-{src}-en"
+# source languages with a dedicated opus-mt-<src>-en model; anything else uses the multilingual one
+OPUS_MT_SOURCES = {
+    "ar", "bn", "cs", "da", "de", "es", "fi", "fr", "he", "hi", "id", "it", "ja",
+    "ko", "nl", "pl", "ru", "sv", "th", "tr", "uk", "ur", "vi", "zh",
+}
+HF_MULTI_TRANSLATION_MODEL = os.getenv("HF_MULTI_TRANSLATION_MODEL", "Helsinki-NLP/opus-mt-mul-en")
 # sentiment analysis model
 HF_SENTIMENT_MODEL = os.getenv("HF_SENTIMENT_MODEL", "cardiffnlp/twitter-roberta-base-sentiment-latest")
 
@@ -40,8 +100,123 @@ logger = logging.getLogger(__name__)
 
 HF_TIMEOUT = 60
 HF_RETRIES = 2
+# retries: total seconds a call may spend waiting on backoff, base and cap of the exponential backoff
+HF_RETRY_BUDGET = float(os.getenv("HF_RETRY_BUDGET", "30"))
+HF_BACKOFF_BASE = float(os.getenv("HF_BACKOFF_BASE", "0.5"))
+HF_BACKOFF_CAP = float(os.getenv("HF_BACKOFF_CAP", "8"))
+# circuit breaker: consecutive failures that open a model's circuit, seconds it stays open
+HF_BREAKER_THRESHOLD = max(1, int(os.getenv("HF_BREAKER_THRESHOLD", "5")))
+HF_BREAKER_COOLDOWN = float(os.getenv("HF_BREAKER_COOLDOWN", "30"))
+# token bucket per worker process: sustained requests per second (0 = unlimited) and burst size
+HF_RATE_LIMIT = max(0.0, float(os.getenv("HF_RATE_LIMIT", "8")))
+HF_RATE_BURST = max(1, int(os.getenv("HF_RATE_BURST", "16")))
+# max concurrent HF calls per request during the map phase
+HF_MAX_CONCURRENCY = max(1, int(os.getenv("HF_MAX_CONCURRENCY", "4")))
+HF_BASE_URL = os.getenv("HF_BASE_URL", "https://router.huggingface.co/hf-inference/models")
+# keep-alive connections kept per worker process
+HF_POOL_SIZE = max(1, int(os.getenv("HF_POOL_SIZE", str(HF_MAX_CONCURRENCY + 4))))
+# inference cache: in-memory LRU entries per worker + sqlite file shared by all workers
+HF_CACHE_SIZE = max(0, int(os.getenv("HF_CACHE_SIZE", "2048")))
+HF_CACHE_PATH = os.getenv("HF_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "cache.sqlite3"))
+HF_CACHE_DISK_MAX_ENTRIES = max(0, int(os.getenv("HF_CACHE_DISK_MAX_ENTRIES", "200000")))
+# transcript cache (seconds); failures like TranscriptsDisabled use the shorter negative TTL
+YT_TRANSCRIPT_TTL = int(os.getenv("YT_TRANSCRIPT_TTL", "21600"))
+YT_TRANSCRIPT_NEGATIVE_TTL = int(os.getenv("YT_TRANSCRIPT_NEGATIVE_TTL", "600"))
+YT_TRANSCRIPT_CACHE_SIZE = max(0, int(os.getenv("YT_TRANSCRIPT_CACHE_SIZE", "128")))
+# time-range summaries: fixed segment length in seconds, and the cache of chunk summaries per segment
+YT_SEGMENT_SECONDS = max(30, int(os.getenv("YT_SEGMENT_SECONDS", "300")))
+YT_SEGMENT_CACHE_SIZE = max(0, int(os.getenv("YT_SEGMENT_CACHE_SIZE", "1024")))
+YT_SEGMENT_CACHE_TTL = int(os.getenv("YT_SEGMENT_CACHE_TTL", str(7 * 24 * 3600)))
+# offline language identification (see build_langid_model.py)
+LANGID_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_model.json")
+LANGID_SAMPLE_CHARS = 400
+LANGID_MIN_CONFIDENCE = float(os.getenv("LANGID_MIN_CONFIDENCE", "0.9"))
+# share of sample trigrams that must occur in the winning profile; below it the language is unprofiled
+LANGID_MIN_COVERAGE = float(os.getenv("LANGID_MIN_COVERAGE", "0.25"))
+# single-flight: seconds a finished result is offered to waiters in other workers on this host
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", "120"))
+# reduce phase: max characters of joined partial summaries per summarize call (matches the map chunk size)
+REDUCE_MAX_CHARS = max(500, int(os.getenv("REDUCE_MAX_CHARS", "3000")))
+# PDF ingestion: upload limit, extraction processes per worker (0 = in-process), pages per extraction task
+PDF_MAX_UPLOAD_MB = max(1, int(os.getenv("PDF_MAX_UPLOAD_MB", "50")))
+PDF_EXTRACT_PROCESSES = max(0, int(os.getenv("PDF_EXTRACT_PROCESSES", str(min(4, os.cpu_count() or 1)))))
+PDF_PAGES_PER_TASK = max(1, int(os.getenv("PDF_PAGES_PER_TASK", "8")))
+app.config["MAX_CONTENT_LENGTH"] = PDF_MAX_UPLOAD_MB * 1024 * 1024
+# page-level PDF cache: extracted text by page content hash, chunk summaries by page-group text hash
+PDF_CACHE_SIZE = max(0, int(os.getenv("PDF_CACHE_SIZE", "1024")))
+PDF_CACHE_TTL = int(os.getenv("PDF_CACHE_TTL", str(7 * 24 * 3600)))
+# page groups end, once PDF_MIN_GROUP_CHARS is reached, at a page whose text hash is 0 mod the divisor, or at the max size
+PDF_MIN_GROUP_CHARS = max(1, int(os.getenv("PDF_MIN_GROUP_CHARS", "1000")))
+PDF_GROUP_BOUNDARY_DIVISOR = max(1, int(os.getenv("PDF_GROUP_BOUNDARY_DIVISOR", "4")))
+PDF_MAX_GROUP_CHARS = max(PDF_MIN_GROUP_CHARS, int(os.getenv("PDF_MAX_GROUP_CHARS", "12000")))
+# content-defined chunking: smallest chunk, 1-in-N sentence boundaries that end a chunk, hashed window
+CDC_MIN_CHARS = max(1, int(os.getenv("CDC_MIN_CHARS", "1200")))
+CDC_BOUNDARY_DIVISOR = max(1, int(os.getenv("CDC_BOUNDARY_DIVISOR", "8")))
+CDC_WINDOW_CHARS = 64
+# mode=fast extractive pre-compression: fraction of characters kept, optional hard budget (0 = none), inputs shorter than this are left alone
+FAST_MODE_RATIO = min(1.0, max(0.05, float(os.getenv("FAST_MODE_RATIO", "0.3"))))
+FAST_MODE_MAX_CHARS = max(0, int(os.getenv("FAST_MODE_MAX_CHARS", "0")))
+FAST_MODE_MIN_CHARS = max(0, int(os.getenv("FAST_MODE_MIN_CHARS", "3000")))
+SUMMARY_MODES = ("", "fast")
+# model warm-up: seconds between keep-alive pings per model (0 = off), scheduler tick, how long a
+# used model is kept hot, pings per tick, extra models to keep hot (comma-separated)
+WARMUP_INTERVAL = max(0, int(os.getenv("WARMUP_INTERVAL", "240")))
+WARMUP_TICK = max(1, int(os.getenv("WARMUP_TICK", "30")))
+WARMUP_RECENT_SECONDS = max(0, int(os.getenv("WARMUP_RECENT_SECONDS", str(6 * 3600))))
+WARMUP_MAX_PER_TICK = max(1, int(os.getenv("WARMUP_MAX_PER_TICK", "4")))
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "").split(",") if m.strip()]
+# metrics: per-process snapshot directory shared by workers, seconds between snapshots, age after which a dead worker's snapshot is dropped
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(HF_CACHE_PATH), "metrics") if HF_CACHE_PATH else "")
+METRICS_FLUSH_SECONDS = max(1, int(os.getenv("METRICS_FLUSH_SECONDS", "5")))
+METRICS_FILE_TTL = int(os.getenv("METRICS_FILE_TTL", str(24 * 3600)))
+# request tracing (?trace= or X-Trace): where trace=file writes traces, whether trace=profile may sample stacks, sampling period
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(os.path.dirname(HF_CACHE_PATH), "traces") if HF_CACHE_PATH else tempfile.gettempdir())
+TRACE_PROFILE_ENABLED = os.getenv("TRACE_PROFILE_ENABLED", "false").lower() == "true"
+TRACE_PROFILE_INTERVAL_MS = max(1, int(os.getenv("TRACE_PROFILE_INTERVAL_MS", "5")))
+# async jobs: pipeline threads per worker process, queued jobs allowed, seconds results are kept
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "2")))
+JOB_QUEUE_LIMIT = max(1, int(os.getenv("JOB_QUEUE_LIMIT", "50")))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# /summarize/batch: items per request, items summarized at once per batch, inference calls in flight shared by batch items
+BATCH_MAX_ITEMS = max(1, int(os.getenv("BATCH_MAX_ITEMS", "200")))
+BATCH_ITEM_CONCURRENCY = max(1, int(os.getenv("BATCH_ITEM_CONCURRENCY", "8")))
+BATCH_HF_CONCURRENCY = max(1, int(os.getenv("BATCH_HF_CONCURRENCY", str(HF_POOL_SIZE))))
+# translation: characters per chunk (opus-mt input limit) and chunks per inference call
+TRANSLATION_CHUNK_CHARS = 2500
+TRANSLATION_BATCH_SIZE = max(1, int(os.getenv("TRANSLATION_BATCH_SIZE", "4")))
+# translation batches in flight at once in the translate -> summarize pipeline
+TRANSLATION_WINDOW = max(1, int(os.getenv("TRANSLATION_WINDOW", str(max(1, HF_MAX_CONCURRENCY // 2)))))
+# mood analysis batching: intervals per sentiment call and total characters per call
+SENTIMENT_BATCH_SIZE = max(1, int(os.getenv("SENTIMENT_BATCH_SIZE", "32")))
+SENTIMENT_BATCH_CHARS = max(1, int(os.getenv("SENTIMENT_BATCH_CHARS", "12000")))
+# inference backend per task: "hf" (inference router) or "local" (in-process CPU engine, needs transformers + torch)
+INFERENCE_TASKS = ("summarization", "translation", "sentiment")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "hf").lower()
+INFERENCE_BACKENDS = {
+    task: os.getenv(f"INFERENCE_BACKEND_{task.upper()}", INFERENCE_BACKEND).lower() for task in INFERENCE_TASKS
+}
+# local engine: torch threads per worker, concurrent forward passes, batch size, ms a batch waits to fill
+LOCAL_INFERENCE_THREADS = max(1, int(os.getenv("LOCAL_INFERENCE_THREADS", str(os.cpu_count() or 1))))
+LOCAL_MAX_CONCURRENCY = max(1, int(os.getenv("LOCAL_MAX_CONCURRENCY", "1")))
+LOCAL_BATCH_SIZE = max(1, int(os.getenv("LOCAL_BATCH_SIZE", "8")))
+LOCAL_BATCH_WAIT_MS = max(0, int(os.getenv("LOCAL_BATCH_WAIT_MS", "10")))
+# default request parameters per model; explicit parameters override these
+HF_MODEL_PARAMS = {
+    HF_SUMMARY_MODEL: {"max_length": 150, "min_length": 50, "do_sample": False},
+}
 
 # ---------------- utilities ----------------
+class PipelineError(Exception):
+    """Expected pipeline failure; carries the JSON error body and HTTP status for the route."""
+
+    def __init__(self, payload: dict, status: int = 500):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+        self.status = status
+
+def no_progress(event: str, data: dict):
+    """Default progress callback for pipelines; streaming routes pass a real one."""
+
 def extract_video_id(url: str):
     if not url:
         return None
@@ -85,388 +260,1595 @@ def chunk_text(text: str, max_chars: int = 3000, overlap: int = 200):
             start = 0
     return chunks
 
-def hf_inference(model: str, inputs: str, timeout: int = HF_TIMEOUT):
+_SENTENCE_END = re.compile(r'[.!?\u2026\u3002\uff01\uff1f]+["\'\u201d\u2019)\]]*\s+|\n\s*\n')
+
+def content_defined_chunks(text: str, max_chars: int = 3000, min_chars: int = None, overlap: int = 200):
     """
-    Call Hugging Face Inference API for given model and inputs.
-    Returns (status_code, parsed_result_or_text)
+    Split text at sentence boundaries chosen by content rather than offset.
+    A boundary ends a chunk once the chunk holds min_chars and the hash of the
+    CDC_WINDOW_CHARS before it is 0 mod CDC_BOUNDARY_DIVISOR; a chunk that
+    reaches max_chars - overlap without one is cut at its last boundary.
+    Because the decision only looks at nearby text, an edit moves at most the
+    chunks around it and later boundaries resynchronize. Each chunk after the
+    first is prefixed with the whole trailing sentences (up to `overlap`
+    chars) of the previous one.
     """
-    if not HF_API_KEY:
-        raise ValueError("HF_API_KEY not set in environment variables")
-    headers = {"Authorization": f"Bearer {HF_API_KEY}"}
-    payload = {"inputs": inputs}
-    # For summarization we may pass parameters; caller can extend payload if needed.
-    try:
-        r = requests.post(
-            f"https://router.huggingface.co/hf-inference/models/{model}",
-            headers=headers,
-            json=payload,
-            timeout=timeout
-        )
-    except Exception as e:
-        logger.warning("HF request exception: %s", e)
-        return None, {"error": str(e)}
-    try:
-        data = r.json()
-    except Exception:
-        data = r.text
-    return r.status_code, data
+    text = (text or "").strip()
+    if not text:
+        return []
+    if len(text) <= max_chars:
+        return [text]
+    limit = max(1, max_chars - max(0, overlap))
+    min_chars = min(min_chars or CDC_MIN_CHARS, limit)
+    boundaries = [m.end() for m in _SENTENCE_END.finditer(text)]
+    if not boundaries or boundaries[-1] != len(text):
+        boundaries.append(len(text))
 
-def call_hf_summarize(text: str):
-    """Summarize text using HF summary model with retries and robust parsing."""
-    if not HF_API_KEY:
-        raise ValueError("HF_API_KEY not configured")
-    payload_template = {
-        "inputs": text,
-        "parameters": {"max_length": 150, "min_length": 50, "do_sample": False}
+    spans = []
+    start, last = 0, None
+    for b in boundaries:
+        while b - start > limit:
+            cut = last
+            if cut is None:
+                # no sentence boundary fits: cut at the last space before the limit
+                space = text.rfind(" ", start + min_chars, start + limit)
+                cut = space if space > start else start + limit
+            spans.append((start, cut))
+            start, last = cut, None
+        if b == len(text):
+            break
+        window = text[max(start, b - CDC_WINDOW_CHARS):b].strip().encode("utf-8")
+        if b - start >= min_chars and zlib.crc32(window) % CDC_BOUNDARY_DIVISOR == 0:
+            spans.append((start, b))
+            start, last = b, None
+        else:
+            last = b
+    if start < len(text):
+        spans.append((start, len(text)))
+
+    chunks = []
+    for i, (s, e) in enumerate(spans):
+        prefix = ""
+        if i and overlap > 0:
+            ps, pe = spans[i - 1]
+            # earliest boundary inside the previous chunk that leaves at most `overlap` chars
+            j = bisect.bisect_left(boundaries, max(ps + 1, pe - overlap))
+            tail = boundaries[j] if j < len(boundaries) and boundaries[j] < pe else None
+            if tail is None:
+                space = text.find(" ", max(ps, pe - overlap), pe)
+                tail = space if space != -1 else pe
+            prefix = text[tail:pe].strip()
+        chunk = (prefix + " " + text[s:e].strip()).strip()
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+_WORD = re.compile(r"\w{2,}")
+
+def textrank_scores(sentences, damping: float = 0.85, iterations: int = 50, tol: float = 1e-6):
+    """
+    TextRank over TF-IDF sentence vectors. The similarity graph is never
+    materialized: with X the row-normalized sparse TF-IDF matrix (kept as
+    row/col/value arrays), S v = X (X^T v) - diag(S) v, so each power
+    iteration is O(nonzeros). Returns a NumPy array of scores aligned with `sentences`.
+    """
+    n = len(sentences)
+    rows, words = [], []
+    for i, sentence in enumerate(sentences):
+        tokens = _WORD.findall(sentence.lower())
+        rows.extend([i] * len(tokens))
+        words.extend(tokens)
+    if not words:
+        return np.full(n, 1.0 / max(n, 1))
+    vocab, cols = np.unique(np.array(words), return_inverse=True)
+    pairs, counts = np.unique(np.array(rows, dtype=np.int64) * len(vocab) + cols, return_counts=True)
+    rows, cols = pairs // len(vocab), pairs % len(vocab)
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    vals = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=n))
+    vals = vals / norms[rows]
+    self_sim = np.bincount(rows, weights=vals * vals, minlength=n)
+
+    def similarity_dot(v):
+        xt_v = np.bincount(cols, weights=vals * v[rows], minlength=len(vocab))
+        return np.bincount(rows, weights=vals * xt_v[cols], minlength=n) - self_sim * v
+
+    degree = similarity_dot(np.ones(n))
+    connected = degree > 1e-12
+    inv_degree = np.where(connected, 1.0 / np.where(connected, degree, 1.0), 0.0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1.0 - damping) / n + damping * similarity_dot(scores * inv_degree)
+        # sentences with no similar neighbour spread their mass uniformly
+        updated += damping * scores[~connected].sum() / n
+        if np.abs(updated - scores).sum() < tol:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+def extractive_compress(text: str, ratio: float = None, max_chars: int = None):
+    """
+    Keep the highest-ranked sentences of `text`, in their original order, up to
+    `ratio` of its characters (and at most `max_chars` when given).
+    Returns (compressed_text, stats).
+    """
+    if np is None:
+        raise RuntimeError("NumPy is not installed. Install numpy to enable mode=fast.")
+    ratio = ratio or FAST_MODE_RATIO
+    max_chars = FAST_MODE_MAX_CHARS if max_chars is None else max_chars
+    text = (text or "").strip()
+    bounds = [0] + [m.end() for m in _SENTENCE_END.finditer(text)] + [len(text)]
+    sentences = [text[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+    sentences = [x for x in sentences if x]
+    budget = int(len(text) * ratio)
+    if max_chars:
+        budget = min(budget, max_chars)
+    kept = sentences
+    if len(text) > max(FAST_MODE_MIN_CHARS, budget) and len(sentences) > 1:
+        scores = textrank_scores(sentences)
+        chosen, size = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if chosen and size + len(sentences[i]) > budget:
+                continue
+            chosen.append(int(i))
+            size += len(sentences[i]) + 1
+        kept = [sentences[i] for i in sorted(chosen)]
+    compressed = " ".join(kept)
+    stats = {
+        "mode": "fast",
+        "original_chars": len(text),
+        "compressed_chars": len(compressed),
+        "ratio": round(len(compressed) / len(text), 4) if text else 1.0,
+        "sentences": len(sentences),
+        "sentences_kept": len(kept),
     }
-    headers = {"Authorization": f"Bearer {HF_API_KEY}"}
-    last_err = None
-    for attempt in range(HF_RETRIES + 1):
+    return compressed, stats
+
+def compress_for_mode(text: str, mode: str, progress=no_progress):
+    """Apply the pre-compression stage for `mode`; returns (text, compression_stats or None)."""
+    if mode != "fast":
+        return text, None
+    with stage_timer("compress"):
+        compressed, stats = extractive_compress(text)
+    progress("compress", stats)
+    return compressed, stats
+
+# ---------------- metrics ----------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# name: (type, help, label names, histogram buckets)
+METRIC_DEFS = {
+    "aiext_request_seconds": ("histogram", "End-to-end pipeline time per request.", ("route",), LATENCY_BUCKETS),
+    "aiext_requests_total": ("counter", "Pipeline runs by outcome.", ("route", "outcome"), None),
+    "aiext_request_chunks": ("histogram", "Map-phase chunks per request.", ("route",), COUNT_BUCKETS),
+    "aiext_stage_seconds": ("histogram", "Time per pipeline stage or inference call.", ("stage", "route", "model"), LATENCY_BUCKETS),
+    "aiext_hf_responses_total": ("counter", "Inference router responses by status code (error = transport failure).", ("model", "status"), None),
+    "aiext_hf_retries_total": ("counter", "Inference router attempts that were retried.", ("model",), None),
+    "aiext_upload_bytes_total": ("counter", "Bytes uploaded.", ("route",), None),
+    "aiext_cache_requests_total": ("counter", "Cache lookups by result.", ("cache", "result"), None),
+}
+
+# route label for metrics recorded anywhere below a request's pipeline
+current_route = contextvars.ContextVar("current_route", default="")
+
+def in_context(fn):
+    """Bind `fn` to a copy of the caller's context, so work handed to pool threads keeps the route label."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+class Metrics:
+    """
+    Counters and histograms kept in process memory (one lock, a dict update
+    per observation). Each gunicorn worker writes its totals to its own JSON
+    file in METRICS_DIR every METRICS_FLUSH_SECONDS; /metrics sums every
+    worker's file, replacing its own with live values, and renders the
+    Prometheus text format. Values only grow, so a worker's last snapshot
+    stays valid after it exits until METRICS_FILE_TTL.
+    """
+
+    def __init__(self, directory: str, definitions: dict = None):
+        self.directory = directory
+        self.definitions = definitions or METRIC_DEFS
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._flusher_pid = None
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        buckets = self.definitions[name][3]
+        key = (name, labels)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            h[0][bisect.bisect_left(buckets, value)] += 1
+            h[1] += value
+            h[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, labels: tuple):
+        started = time.perf_counter()
         try:
-            resp = requests.post(
-                f"https://router.huggingface.co/hf-inference/models/{HF_SUMMARY_MODEL}",
-                headers=headers,
-                json=payload_template,
-                timeout=HF_TIMEOUT
-            )
-            # parse
-            if resp.status_code == 200:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self._counters.items()],
+                "histograms": [[n, list(l), list(h[0]), h[1], h[2]] for (n, l), h in self._histograms.items()],
+            }
+
+    def _path(self):
+        if self._file is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._file = os.path.join(self.directory, f"metrics-{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        return self._file
+
+    def flush(self):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path()
+            with open(path + ".tmp", "w") as fh:
+                json.dump(self.snapshot(), fh)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning("Metrics flush failed: %s", e)
+
+    def collect(self):
+        """Totals across this process (live) and every other worker's latest snapshot."""
+        snapshots = [self.snapshot()]
+        own = self._path() if self.directory else None
+        if self.directory and os.path.isdir(self.directory):
+            now = time.time()
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not name.endswith(".json") or path == own:
+                    continue
                 try:
-                    data = resp.json()
-                except Exception:
-                    return resp.text
-                # handle shapes
-                if isinstance(data, list) and len(data) and isinstance(data[0], dict):
-                    # some models return [{'summary_text': '...'}]
-                    if "summary_text" in data[0]:
-                        return data[0]["summary_text"]
-                    # other models might use 'generated_text'
-                    if "generated_text" in data[0]:
-                        return data[0]["generated_text"]
-                    # fallback to first value
-                    for v in data[0].values():
-                        if isinstance(v, str):
-                            return v
-                    return str(data[0])
-                if isinstance(data, dict):
-                    if "summary_text" in data:
-                        return data["summary_text"]
-                    if "generated_text" in data:
-                        return data["generated_text"]
-                    # fallback
-                    for v in data.values():
-                        if isinstance(v, str):
-                            return v
-                    return str(data)
-                if isinstance(data, str):
-                    return data
-                return str(data)
-            else:
-                last_err = f"{resp.status_code}: {resp.text}"
-                logger.warning("HF summarize attempt %d failed: %s", attempt + 1, last_err)
-                time.sleep(1 + attempt)
-        except requests.RequestException as e:
-            last_err = str(e)
-            logger.warning("HF summarize request exception attempt %d: %s", attempt + 1, last_err)
-            time.sleep(1 + attempt)
-    raise RuntimeError(f"Hugging Face summarization failed after retries: {last_err}")
-
-def call_hf_translate(text: str, src_lang: str):
-    """
-    Translate `text` from src_lang to English using HF translation model.
-    Returns translated_text on success, None on failure.
-    """
-    if not HF_API_KEY:
-        raise ValueError("HF_API_KEY not configured")
-    # sanitize src_lang to simple code (e.g., 'hi' or 'pt' etc.)
-    src = (src_lang or "").split("-")[0].lower()
-    model_name = TRANSLATION_MODEL_TEMPLATE.format(src=src)
-    logger.info("Attempting translation using model %s", model_name)
-    # translate in chunks to avoid input length limits
-    chunks = chunk_text(text, max_chars=2500, overlap=100)
-    translated_chunks = []
-    for i, ch in enumerate(chunks):
-        status, data = hf_inference(model_name, ch)
-        if status == 200 and data:
-            # try common output keys
-            translated = None
-            if isinstance(data, list) and len(data) and isinstance(data[0], dict):
-                # translation models often return {'translation_text': '...'} or {'generated_text': '...' }
-                translated = data[0].get("translation_text") or data[0].get("generated_text") or next((v for v in data[0].values() if isinstance(v, str)), None)
-            elif isinstance(data, dict):
-                translated = data.get("translation_text") or data.get("generated_text") or next((v for v in data.values() if isinstance(v, str)), None)
-            elif isinstance(data, str):
-                translated = data
-            if translated:
-                translated_chunks.append(translated)
+                    if METRICS_FILE_TTL and now - os.path.getmtime(path) > METRICS_FILE_TTL:
+                        os.remove(path)
+                        continue
+                    with open(path) as fh:
+                        snapshots.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue
+        counters, histograms = {}, {}
+        for snap in snapshots:
+            for name, labels, value in snap.get("counters", []):
+                key = (name, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snap.get("histograms", []):
+                key = (name, tuple(labels))
+                h = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                if len(h[0]) != len(buckets):
+                    continue
+                h[0] = [a + b for a, b in zip(h[0], buckets)]
+                h[1] += total
+                h[2] += count
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self.collect()
+
+        def fmt_labels(names, values, extra=None):
+            pairs = list(zip(names, values)) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in self.definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{fmt_labels(label_names, labels)} {value:g}")
                 continue
+            for (n, labels), (counts, total, count) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip(list(buckets) + ["+Inf"], counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{fmt_labels(label_names, labels, ('le', bound if bound == '+Inf' else f'{bound:g}'))} {cumulative}")
+                lines.append(f"{name}_sum{fmt_labels(label_names, labels)} {total:.6f}")
+                lines.append(f"{name}_count{fmt_labels(label_names, labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _run(self):
+        while True:
+            time.sleep(METRICS_FLUSH_SECONDS)
+            self.flush()
+
+    def start(self):
+        """Start the snapshot thread once per process (again after a fork)."""
+        if not self.directory:
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+metrics = Metrics(METRICS_DIR)
+
+# ---------------- tracing ----------------
+# innermost open span of the request's trace, or None when the request is not traced
+current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "start", "end", "attrs", "thread")
+
+    def __init__(self, trace, span_id: int, parent, name: str, attrs: dict):
+        self.trace = trace
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, n: int = 1):
+        self.attrs[key] = self.attrs.get(key, 0) + n
+
+class _NoSpan:
+    """Stand-in yielded when the request is not traced, so call sites never branch."""
+    def set(self, **attrs):
+        pass
+
+    def add(self, key: str, n: int = 1):
+        pass
+
+NO_SPAN = _NoSpan()
+
+class Trace:
+    """Span tree for one request; spans may be opened from any thread that carries the request context."""
+
+    def __init__(self, name: str, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.created = time.time()
+        self._spans = []
+        self._lock = threading.Lock()
+        self.threads = set()
+        self.root = self.open(name, None, attrs)
+
+    def open(self, name: str, parent, attrs: dict):
+        with self._lock:
+            span_obj = Span(self, len(self._spans), parent, name, attrs)
+            self._spans.append(span_obj)
+            self.threads.add(threading.get_ident())
+        return span_obj
+
+    def to_dict(self):
+        origin = self.root.start
+        with self._lock:
+            spans = list(self._spans)
+        nodes = {}
+        for sp in spans:
+            nodes[sp.id] = {
+                "name": sp.name,
+                "start_ms": round((sp.start - origin) * 1000, 2),
+                "duration_ms": round((sp.end - sp.start) * 1000, 2) if sp.end is not None else None,
+                "thread": sp.thread,
+                **({"attrs": dict(sp.attrs)} if sp.attrs else {}),
+            }
+        for sp in spans:
+            if sp.parent is not None:
+                nodes[sp.parent].setdefault("children", []).append(nodes[sp.id])
+        return {"trace_id": self.id, "created": self.created, "spans": len(spans), "root": nodes[self.root.id]}
+
+@contextmanager
+def span(name: str, **attrs):
+    """Open a child of the current span for the duration of the block; a no-op outside traced requests."""
+    parent = current_span.get()
+    if parent is None:
+        yield NO_SPAN
+        return
+    child = parent.trace.open(name, parent.id, attrs)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attrs["error"] = str(e)[:200]
+        raise
+    finally:
+        child.end = time.perf_counter()
+        current_span.reset(token)
+
+@contextmanager
+def stage_timer(stage: str, model: str = ""):
+    """Time a pipeline stage into aiext_stage_seconds and the request trace."""
+    with span(stage, **({"model": model} if model else {})) as stage_span:
+        with metrics.timer("aiext_stage_seconds", (stage, current_route.get(), model)):
+            yield stage_span
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads a trace has run on every
+    TRACE_PROFILE_INTERVAL_MS. A sample counts as on-CPU when the thread's
+    CPU clock advanced by half an interval since the previous one (Linux;
+    elsewhere every sample does), so threads parked on locks, sleeps or sockets do not drown out the
+    hot spots. Reports the hottest functions (self and inclusive samples) and
+    stacks in collapsed form. Pool threads are shared, so a concurrent
+    request on the same thread can show up.
+    """
+
+    def __init__(self, trace: Trace, interval_ms: int = TRACE_PROFILE_INTERVAL_MS):
+        self.trace = trace
+        self.interval = interval_ms / 1000.0
+        self.samples = 0
+        self.cpu_samples = 0
+        self.stacks = {}
+        self._cpu_clock = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trace-profiler", daemon=True)
+
+    def _on_cpu(self, ident: int):
+        try:
+            used = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return True
+        previous = self._cpu_clock.get(ident)
+        self._cpu_clock[ident] = used
+        # on-CPU for at least half the interval, so brief wake-ups of waiting threads do not count
+        return previous is not None and used - previous >= self.interval / 2
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.trace.threads):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                self.samples += 1
+                if not self._on_cpu(ident):
+                    continue
+                self.cpu_samples += 1
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, top: int = 25):
+        own, total = {}, {}
+        for key, n in self.stacks.items():
+            frames = key.split(";")
+            own[frames[-1]] = own.get(frames[-1], 0) + n
+            for fn in set(frames):
+                total[fn] = total.get(fn, 0) + n
+        hottest = sorted(own.items(), key=lambda kv: -kv[1])[:top]
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "cpu_samples": self.cpu_samples,
+            "functions": [{"function": fn, "self": n, "total": total[fn]} for fn, n in hottest],
+            "stacks": [f"{key} {n}" for key, n in sorted(self.stacks.items(), key=lambda kv: -kv[1])[:top]],
+        }
+
+def trace_mode():
+    """'inline', 'file' or 'profile' when the request asked for a trace (?trace= or X-Trace), else None."""
+    flag = (request.args.get("trace") or request.headers.get("X-Trace") or "").lower()
+    if flag in ("1", "true", "inline"):
+        return "inline"
+    if flag in ("file", "profile"):
+        return flag
+    return None
+
+def traced(run, mode: str, route: str):
+    """
+    Wrap a pipeline callable so it records a span tree. The trace (with a
+    profile when mode='profile' and TRACE_PROFILE_ENABLED) is added to the
+    response as 'trace', or written to TRACE_DIR with mode='file' (also when
+    the pipeline fails) and referenced by 'trace_file'.
+    """
+    def run_traced(progress):
+        trace = Trace("request", route=route)
+        token = current_span.set(trace.root)
+        profiler = SamplingProfiler(trace) if mode == "profile" and TRACE_PROFILE_ENABLED else None
+        result = None
+        try:
+            if profiler:
+                with profiler:
+                    result = run(progress)
             else:
-                logger.warning("Unexpected translation response shape: %s", type(data))
-                return None
-        else:
-            logger.warning("Translation failed (status=%s): %s", status, data)
+                result = run(progress)
+        finally:
+            trace.root.end = time.perf_counter()
+            current_span.reset(token)
+            data = trace.to_dict()
+            if mode == "profile":
+                data["profile"] = profiler.report() if profiler else {"error": "profiling disabled (TRACE_PROFILE_ENABLED)"}
+            path = None
+            if mode == "file":
+                try:
+                    os.makedirs(TRACE_DIR, exist_ok=True)
+                    path = os.path.join(TRACE_DIR, f"trace-{trace.id}.json")
+                    with open(path, "w") as fh:
+                        json.dump(data, fh, indent=1)
+                except OSError as e:
+                    logger.warning("Could not write trace %s: %s", trace.id, e)
+                    path = None
+        if not isinstance(result, dict):
+            return result
+        if mode == "file":
+            return {**result, "trace_id": trace.id, "trace_file": path}
+        return {**result, "trace": data}
+    return run_traced
+
+# ---------------- cache ----------------
+class TieredCache:
+    """
+    Size-bounded in-memory LRU in front of a sqlite table.
+    The sqlite file survives worker restarts and is shared by every gunicorn
+    worker on the host; values must be JSON-serializable. Entries may carry a TTL.
+    """
+
+    def __init__(self, namespace: str, max_items: int = HF_CACHE_SIZE, path: str = HF_CACHE_PATH,
+                 max_disk_entries: int = HF_CACHE_DISK_MAX_ENTRIES):
+        self.namespace = namespace
+        self.max_items = max_items
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._writes = 0
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def _db(self):
+        # connections must not cross a fork, so open one per process
+        if not self.path:
             return None
-    # join and return
-    return "\n".join(translated_chunks)
+        if self._conn is None or self._conn_pid != os.getpid():
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires REAL, created REAL NOT NULL, PRIMARY KEY (ns, key))"
+                )
+                conn.commit()
+            except Exception as e:
+                logger.warning("Disk cache unavailable at %s: %s", self.path, e)
+                self.path = None
+                return None
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
 
-def call_hf_sentiment(text: str):
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._mem.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    metrics.inc("aiext_cache_requests_total", (self.namespace, "hit"))
+                    return value
+                del self._mem[key]
+            db = self._db()
+            row = None
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT value, expires FROM cache WHERE ns = ? AND key = ?", (self.namespace, key)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("Disk cache read failed: %s", e)
+            if row is not None and (row[1] is None or row[1] > now):
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                metrics.inc("aiext_cache_requests_total", (self.namespace, "hit"))
+                return value
+            self.stats["misses"] += 1
+            metrics.inc("aiext_cache_requests_total", (self.namespace, "miss"))
+            return default
+
+    def set(self, key: str, value, ttl: float = None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._remember(key, value, expires)
+            self.stats["writes"] += 1
+            db = self._db()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO cache (ns, key, value, expires, created) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires, time.time())
+                )
+                self._writes += 1
+                if self.max_disk_entries and self._writes % 256 == 0:
+                    self._prune(db)
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning("Disk cache write failed: %s", e)
+
+    def _remember(self, key, value, expires):
+        if self.max_items <= 0:
+            return
+        self._mem[key] = (value, expires)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def _prune(self, db):
+        db.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM cache WHERE ns = ? AND key IN (SELECT key FROM cache WHERE ns = ? "
+            "ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_disk_entries)
+        )
+
+    def snapshot(self):
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "memory_entries": len(self._mem),
+                "hit_rate": round(self.stats["hits"] / total, 4) if total else 0.0,
+                "persistent": bool(self.path),
+            }
+
+def cache_key(*parts):
+    """Stable content hash of JSON-serializable parts (model, parameters, input, ...)."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+inference_cache = TieredCache("inference")
+
+# ---------------- HF client ----------------
+class HFClientError(RuntimeError):
+    """Transport-level failure talking to the inference router (connect, timeout, ...)."""
+
+class CircuitOpenError(HFClientError):
+    """A model's circuit is open (or its hinted retry time is past the caller's budget); failed without calling."""
+
+class TokenBucket:
     """
-    Analyze sentiment of text using HF sentiment model.
-    Returns dict with 'label' (e.g., 'POSITIVE', 'NEGATIVE', 'NEUTRAL') and 'score' (confidence).
+    Thread-safe token bucket. acquire() waits for a token up to a timeout;
+    pause() empties the bucket until a server-imposed time (429 Retry-After).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token if one is available; otherwise return seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.resume_at:
+                return self.resume_at - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout: float):
+        if not self.rate:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.resume_at
+
+class CircuitBreaker:
     """
-    if not HF_API_KEY:
-        raise ValueError("HF_API_KEY not configured")
-    headers = {"Authorization": f"Bearer {HF_API_KEY}"}
-    payload = {"inputs": text}
+    Per-model circuit breaker. HF_BREAKER_THRESHOLD consecutive failures open
+    a model's circuit for HF_BREAKER_COOLDOWN seconds, after which one probe
+    call is let through (half-open). A probe that ends without a verdict
+    (429, no rate-limit token, out of budget) is released, and one that never
+    reports back lapses after another cooldown. Server hints (estimated_time
+    while a model loads) set a shared not-before time so callers wait once
+    instead of each retrying on its own.
+    """
+
+    def __init__(self, threshold: int = HF_BREAKER_THRESHOLD, cooldown: float = HF_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model: str):
+        return self._models.setdefault(model, {"failures": 0, "open_until": 0.0, "not_before": 0.0, "probing": 0.0})
+
+    def wait_time(self, model: str):
+        """
+        Seconds the caller should wait before calling `model`, or None while
+        the circuit is open. After the cooldown the first caller gets 0 as the probe.
+        """
+        with self._lock:
+            state = self._state(model)
+            now = time.monotonic()
+            if state["failures"] >= self.threshold:
+                if now < state["open_until"] or (state["probing"] and now - state["probing"] < self.cooldown):
+                    return None
+                state["probing"] = now
+            return max(0.0, state["not_before"] - now)
+
+    def release(self, model: str):
+        """Give back a half-open probe that ended without success or failure."""
+        with self._lock:
+            self._state(model)["probing"] = 0.0
+
+    def record_success(self, model: str):
+        with self._lock:
+            state = self._state(model)
+            state.update(failures=0, probing=0.0, not_before=0.0)
+
+    def record_failure(self, model: str, retry_after: float = None):
+        with self._lock:
+            state = self._state(model)
+            now = time.monotonic()
+            state["failures"] += 1
+            state["probing"] = 0.0
+            if retry_after:
+                state["not_before"] = max(state["not_before"], now + retry_after)
+            if state["failures"] >= self.threshold:
+                state["open_until"] = now + max(self.cooldown, retry_after or 0)
+                if state["failures"] == self.threshold:
+                    logger.warning("Circuit open for %s for %.0fs", model, state["open_until"] - now)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                model: {
+                    "failures": state["failures"],
+                    "open": state["failures"] >= self.threshold and now < state["open_until"],
+                    "retry_in": round(max(0.0, state["not_before"] - now, state["open_until"] - now), 1),
+                }
+                for model, state in self._models.items() if state["failures"]
+            }
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+def retry_hint(response, data):
+    """Seconds the server asked us to wait: Retry-After header or HF's estimated_time, else None."""
+    value = response.headers.get("Retry-After")
+    if value is None and isinstance(data, dict):
+        value = data.get("estimated_time")
     try:
-        resp = requests.post(
-            f"https://router.huggingface.co/hf-inference/models/{HF_SENTIMENT_MODEL}",
-            headers=headers,
-            json=payload,
-            timeout=HF_TIMEOUT
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list) and len(data) and isinstance(data[0], list):
-                # Some models return [[{'label': 'POSITIVE', 'score': 0.99}, ...]]
-                if len(data[0]) > 0:
-                    return data[0][0]  # Take the top sentiment
-            elif isinstance(data, list) and len(data) and isinstance(data[0], dict):
-                return data[0]
-            elif isinstance(data, dict):
-                return data
-        logger.warning("Sentiment analysis failed: %s", resp.text)
-        return None
-    except Exception as e:
-        logger.warning("Sentiment analysis exception: %s", e)
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
         return None
 
-def chunk_transcript_by_time(transcript_list, interval_seconds=30):
+def backoff_delay(attempt: int, hint: float = None):
+    """Full-jitter exponential backoff; a server hint is honoured with a little jitter on top."""
+    if hint is not None:
+        return hint + random.uniform(0, HF_BACKOFF_BASE)
+    return random.uniform(0, min(HF_BACKOFF_CAP, HF_BACKOFF_BASE * (2 ** attempt)))
+
+class HFClient:
     """
-    Chunk transcript into time intervals.
-    transcript_list: list of dicts with 'start', 'duration', 'text'
-    Returns list of dicts: [{'start': 0, 'end': 30, 'text': '...'}, ...]
+    Pooled keep-alive client for the HF inference router.
+    One instance per worker process; uses HTTP/2 via httpx when installed,
+    otherwise a requests.Session with a sized connection pool.
     """
-    if not transcript_list:
-        return []
-    chunks = []
-    current_start = 0
-    current_text = []
-    for item in transcript_list:
-        start = item.get('start', 0)
-        duration = item.get('duration', 0)
-        text = item.get('text', '').strip()
-        if not text:
-            continue
-        end = start + duration
-        while start >= current_start + interval_seconds:
-            if current_text:
-                chunks.append({
-                    'start': current_start,
-                    'end': current_start + interval_seconds,
-                    'text': ' '.join(current_text)
-                })
-                current_text = []
-            current_start += interval_seconds
-        current_text.append(text)
-    if current_text:
-        chunks.append({
-            'start': current_start,
-            'end': current_start + interval_seconds,
-            'text': ' '.join(current_text)
-        })
-    return chunks
+    name = "hf"
 
-# ---------------- Routes ----------------
+    def __init__(self, api_key: str, base_url: str = HF_BASE_URL, pool_size: int = HF_POOL_SIZE,
+                 timeout: int = HF_TIMEOUT, model_params: dict = None, retries: int = HF_RETRIES,
+                 retry_budget: float = HF_RETRY_BUDGET):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.model_params = dict(model_params or {})
+        self.retries = retries
+        self.retry_budget = retry_budget
+        self.breaker = CircuitBreaker()
+        self.bucket = TokenBucket(HF_RATE_LIMIT, HF_RATE_BURST)
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        if httpx is not None:
+            self.transport = "httpx/h2"
+            self._http = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        else:
+            self.transport = "requests"
+            self._http = requests.Session()
+            self._http.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+            self._http.mount("https://", adapter)
+            self._http.mount("http://", adapter)
 
-@app.route("/")
-def home():
-    return jsonify({"message": "API is running"})
+    def url_for(self, model: str):
+        return f"{self.base_url}/{model}"
 
-@app.route("/favicon.ico")
-def favicon():
-    return send_from_directory("static", "favicon.ico")
+    def params_for(self, model: str, parameters: dict = None):
+        return {**self.model_params.get(model, {}), **(parameters or {})}
 
-@app.route("/summarize/text", methods=["POST"])
-def summarize_text():
-    data = request.json or {}
-    text = (data.get("text") or "").strip()
-    if not text:
-        return jsonify({"error": "No text provided"}), 400
-    try:
-        chunks = chunk_text(text, max_chars=3000)
-        summaries = [call_hf_summarize(c) for c in chunks]
-        final = call_hf_summarize("\n".join(summaries)) if len(summaries) > 1 else summaries[0]
-        return jsonify({"summary": final})
-    except Exception as e:
-        logger.exception("Error in summarize_text: %s", e)
-        return jsonify({"error": "Summarization failed", "detail": str(e)}), 500
+    def _send(self, model: str, payload: dict, timeout: int):
+        with span("http", method="POST", model=model) as http_span:
+            if http_span is not NO_SPAN:
+                http_span.set(request_bytes=len(json.dumps(payload)))
+            try:
+                r = self._http.post(self.url_for(model), json=payload, timeout=timeout)
+            except Exception as e:
+                raise HFClientError(str(e)) from e
+            http_span.set(status=r.status_code, response_bytes=len(r.content))
+            try:
+                data = r.json()
+            except Exception:
+                data = r.text
+            return r, data
 
-@app.route("/summarize/pdf", methods=["POST"])
-def summarize_pdf():
-    if "file" not in request.files:
-        return jsonify({"error": "No file part"}), 400
-    f = request.files["file"]
-    if f.filename == "":
-        return jsonify({"error": "No file selected"}), 400
-    try:
-        if fitz is None:
-            raise RuntimeError("PyMuPDF (fitz) is not installed. Install pymupdf to enable PDF summarization.")
-        doc = fitz.open(stream=f.read(), filetype="pdf")
-        pages_text = [page.get_text() for page in doc]
-        full_text = "\n".join(pages_text).strip()
-        if not full_text:
-            return jsonify({"error": "PDF contains no extractable text"}), 400
-        chunks = chunk_text(full_text, max_chars=3000)
-        summaries = [call_hf_summarize(c) for c in chunks]
-        final = call_hf_summarize("\n".join(summaries)) if len(summaries) > 1 else summaries[0]
-        return jsonify({"summary": final})
-    except Exception as e:
-        logger.exception("Error in summarize_pdf: %s", e)
-        return jsonify({"error": "PDF summarization failed", "detail": str(e)}), 500
+    def post(self, model: str, inputs, parameters: dict = None, timeout: int = None, retries: int = None):
+        """
+        POST `inputs` to `model`, merging per-model default parameters.
+        Transport errors, 429 and 5xx are retried with jittered backoff (or the
+        server's Retry-After / estimated_time) while the retry budget lasts;
+        every attempt takes a rate-limit token and goes through the model's
+        circuit breaker. Returns (status_code, parsed_json_or_text) of the last
+        attempt; raises HFClientError on transport errors and CircuitOpenError
+        when the model is failing fast.
+        """
+        payload = {"inputs": inputs}
+        params = self.params_for(model, parameters)
+        if params:
+            payload["parameters"] = params
+        retries = self.retries if retries is None else retries
+        deadline = time.monotonic() + self.retry_budget
+        status, data, error = None, None, None
+        for attempt in range(retries + 1):
+            wait = self.breaker.wait_time(model)
+            if wait is None:
+                raise CircuitOpenError(f"{model} is unavailable (circuit open)")
+            if time.monotonic() + wait > deadline:
+                self.breaker.release(model)
+                raise CircuitOpenError(f"{model} is unavailable (circuit open)")
+            if wait:
+                time.sleep(wait)
+            if not self.bucket.acquire(max(0.0, deadline - time.monotonic())):
+                self.breaker.release(model)
+                raise HFClientError(f"rate limit: no request slot for {model} within the retry budget")
+            hint = None
+            try:
+                r, data = self._send(model, payload, timeout or self.timeout)
+                status, error = r.status_code, None
+            except HFClientError as e:
+                error = e
+                metrics.inc("aiext_hf_responses_total", (model, "error"))
+                self.breaker.record_failure(model)
+                logger.warning("HF %s attempt %d failed: %s", model, attempt + 1, e)
+            else:
+                metrics.inc("aiext_hf_responses_total", (model, str(status)))
+                if status not in RETRYABLE_STATUSES:
+                    self.breaker.record_success(model)
+                    return status, data
+                hint = retry_hint(r, data)
+                if status == 429:
+                    # quota exhausted: hold back every caller in this process, not just this one
+                    self.bucket.pause(hint or backoff_delay(attempt))
+                    self.breaker.release(model)
+                else:
+                    self.breaker.record_failure(model, hint)
+                logger.warning("HF %s attempt %d returned %s", model, attempt + 1, status)
+            if attempt == retries:
+                break
+            delay = backoff_delay(attempt, hint)
+            if time.monotonic() + delay > deadline:
+                break
+            metrics.inc("aiext_hf_retries_total", (model,))
+            (current_span.get() or NO_SPAN).add("retries")
+            with span("backoff", seconds=round(delay, 3)):
+                time.sleep(delay)
+        if error is not None:
+            raise error
+        return status, data
 
-@app.route("/summarize/youtube", methods=["POST"])
-def summarize_youtube():
-    data = request.json or {}
-    video_url = data.get("video_url")
-    if not video_url:
-        return jsonify({"error": "No video URL provided"}), 400
-    mood_analysis = request.args.get("mood", "false").lower() == "true"
+    def close(self):
+        self._http.close()
 
-    video_id = extract_video_id(video_url)
-    if not video_id:
-        return jsonify({"error": "Invalid YouTube URL / could not extract ID"}), 400
+_hf_client = None
+_hf_client_lock = threading.Lock()
 
-    # import module
-    try:
-        yt_mod = importlib.import_module("youtube_transcript_api")
-    except Exception as e:
-        logger.exception("Failed to import youtube_transcript_api: %s", e)
-        return jsonify({"error": "youtube_transcript_api not installed or failed to import", "detail": str(e)}), 500
+def get_hf_client():
+    """Return this process's shared HFClient, creating it on first use (after gunicorn forks)."""
+    global _hf_client
+    if _hf_client is None:
+        with _hf_client_lock:
+            if _hf_client is None:
+                if not HF_API_KEY:
+                    raise ValueError("HF_API_KEY not configured")
+                _hf_client = HFClient(HF_API_KEY, model_params=HF_MODEL_PARAMS)
+                logger.info("HF client ready (transport=%s, pool=%d)", _hf_client.transport, HF_POOL_SIZE)
+    return _hf_client
 
-    YTClass = getattr(yt_mod, "YouTubeTranscriptApi", None)
-    transcript_obj = None
-    tried_methods = []
+class LocalBackend:
+    """
+    In-process CPU inference with the same interface and response shapes as
+    HFClient, built on transformers pipelines (loaded per model on first use).
+    Concurrent single-input calls for one model are gathered for up to
+    LOCAL_BATCH_WAIT_MS and run as one batch; at most LOCAL_MAX_CONCURRENCY
+    forward passes run at once, each on LOCAL_INFERENCE_THREADS torch threads.
+    """
+    name = "local"
+    transport = "local"
+    # pipeline task and call arguments per inference task
+    PIPELINE_TASKS = {"summarization": "summarization", "translation": "translation", "sentiment": "text-classification"}
+    CALL_ARGS = {"sentiment": {"top_k": None}}
 
-    # 1) Try instance methods (newer API)
-    if YTClass:
+    def __init__(self, threads: int = LOCAL_INFERENCE_THREADS, max_concurrency: int = LOCAL_MAX_CONCURRENCY,
+                 batch_size: int = LOCAL_BATCH_SIZE, batch_wait_ms: int = LOCAL_BATCH_WAIT_MS,
+                 timeout: int = HF_TIMEOUT, model_params: dict = None):
+        # imported lazily: loading torch costs seconds and memory that HF-only deployments should not pay
         try:
-            inst = None
-            try:
-                inst = YTClass()
-            except Exception as e_inst:
-                logger.debug("Could not instantiate YouTubeTranscriptApi: %s", e_inst)
-            if inst:
-                # try common instance methods
-                for name in ("fetch", "list", "get_transcript", "get_transcripts", "list_transcripts"):
-                    if hasattr(inst, name) and callable(getattr(inst, name)):
-                        tried_methods.append(f"inst.{name}")
-                        try:
-                            fn = getattr(inst, name)
-                            # some functions expect list of ids
-                            try:
-                                transcript_obj = fn(video_id)
-                            except TypeError:
-                                transcript_obj = fn([video_id])
-                            logger.info("Used inst.%s", name)
-                            break
-                        except Exception as e:
-                            logger.warning("inst.%s failed: %s", name, e)
-                            transcript_obj = None
+            self._torch = importlib.import_module("torch")
+            self._transformers = importlib.import_module("transformers")
         except Exception as e:
-            logger.debug("Instance method attempts raised: %s", e)
+            raise RuntimeError("transformers and torch are required for the local inference backend") from e
+        self._torch.set_num_threads(threads)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.timeout = timeout
+        self.model_params = dict(model_params or {})
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pipelines = {}
+        self._load_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
 
-    # 2) Try class methods
-    if transcript_obj is None and YTClass:
-        for name in ("get_transcript", "get_transcripts", "fetch", "list", "list_transcripts"):
-            if hasattr(YTClass, name) and callable(getattr(YTClass, name)):
-                tried_methods.append(f"YTClass.{name}")
-                try:
-                    fn = getattr(YTClass, name)
-                    try:
-                        transcript_obj = fn(video_id)
-                    except TypeError:
-                        transcript_obj = fn([video_id])
-                    logger.info("Used YTClass.%s", name)
-                    break
-                except Exception as e:
-                    logger.warning("YTClass.%s failed: %s", name, e)
-                    transcript_obj = None
-
-    # 3) Try module-level functions
-    if transcript_obj is None:
-        for name in ("get_transcript", "get_transcripts", "fetch_transcript", "list_transcripts"):
-            fn = getattr(yt_mod, name, None)
-            if callable(fn):
-                tried_methods.append(f"module.{name}")
-                try:
-                    try:
-                        transcript_obj = fn(video_id)
-                    except TypeError:
-                        transcript_obj = fn([video_id])
-                    logger.info("Used module.%s", name)
-                    break
-                except Exception as e:
-                    logger.warning("module.%s failed: %s", name, e)
-                    transcript_obj = None
+    def params_for(self, model: str, parameters: dict = None):
+        return {**self.model_params.get(model, {}), **(parameters or {})}
+
+    def _pipeline(self, model: str):
+        with self._load_lock:
+            pipe = self._pipelines.get(model)
+            if pipe is None:
+                started = time.time()
+                pipe = self._transformers.pipeline(self.PIPELINE_TASKS[task_for(model)], model=model, device=-1)
+                self._pipelines[model] = pipe
+                logger.info("Local model %s loaded in %.1fs", model, time.time() - started)
+            return pipe
+
+    def _run(self, model: str, params: dict, texts):
+        pipe = self._pipeline(model)
+        args = {**self.CALL_ARGS.get(task_for(model), {}), **params}
+        with self._slots:
+            with self._torch.inference_mode():
+                return list(pipe(list(texts), batch_size=self.batch_size, truncation=True, **args))
+
+    def _submit(self, model: str, params: dict, text: str, timeout: float):
+        """Queue one input; the first caller for a (model, params) waits for the batch to fill and runs it."""
+        key = (model, json.dumps(params, sort_keys=True))
+        item = {"input": text, "done": threading.Event()}
+        with self._pending_lock:
+            batch = self._pending.setdefault(key, [])
+            batch.append(item)
+            leader = len(batch) == 1
+        if leader:
+            if self.batch_wait:
+                time.sleep(self.batch_wait)
+            with self._pending_lock:
+                batch = self._pending.pop(key)
+            try:
+                for entry, output in zip(batch, self._run(model, params, [entry["input"] for entry in batch])):
+                    entry["result"] = output
+            except Exception as e:
+                for entry in batch:
+                    entry["error"] = e
+            finally:
+                for entry in batch:
+                    entry["done"].set()
+        elif not item["done"].wait(timeout):
+            raise TimeoutError(f"local inference on {model} timed out")
+        if "error" in item:
+            raise item["error"]
+        return item["result"]
 
-    # 4) internal _api
-    if transcript_obj is None:
+    def post(self, model: str, inputs, parameters: dict = None, timeout: int = None):
+        """
+        Run `model` on a string or a list of strings.
+        Returns (status_code, data) shaped like the router's response; failures come back as (500, {'error'}).
+        """
+        params = self.params_for(model, parameters)
         try:
-            api_mod = importlib.import_module("youtube_transcript_api._api")
-            for name in ("fetch", "list", "get_transcript", "get_transcripts"):
-                fn = getattr(api_mod, name, None)
-                if callable(fn):
-                    tried_methods.append(f"_api.{name}")
-                    try:
-                        transcript_obj = fn(video_id)
-                        logger.info("Used _api.%s", name)
-                        break
-                    except Exception as e:
-                        logger.warning("_api.%s failed: %s", name, e)
-                        transcript_obj = None
+            if isinstance(inputs, list):
+                return 200, self._run(model, params, inputs)
+            return 200, [self._submit(model, params, inputs, timeout or self.timeout)]
         except Exception as e:
-            logger.debug("_api import failed: %s", e)
+            logger.warning("Local inference with %s failed: %s", model, e)
+            return 500, {"error": str(e)}
 
-    logger.info("Transcript retrieval tried: %s", tried_methods)
+    def close(self):
+        self._pipelines.clear()
 
-    if transcript_obj is None:
-        return jsonify({"error": "Failed to fetch transcript — see server logs for attempted methods", "tried": tried_methods}), 500
+def task_for(model: str):
+    """Which inference task a model serves, for picking its backend."""
+    if model == HF_SENTIMENT_MODEL:
+        return "sentiment"
+    if model == HF_MULTI_TRANSLATION_MODEL or model.startswith(TRANSLATION_MODEL_TEMPLATE.split("{")[0]):
+        return "translation"
+    return "summarization"
 
-    # Normalize transcript_obj -> list of dicts with timestamps and text
-    transcript_list = []
-    transcript_language = None
+_backends = {}
+_backends_lock = threading.Lock()
 
-    try:
-        # Handle TranscriptList: try to find and fetch a transcript
-        if hasattr(transcript_obj, "find_transcript"):
-            # TranscriptList - try to get the first available transcript
-            try:
-                # Try to find transcript in preferred languages: English first, then any available
-                available_langs = []
-                if hasattr(transcript_obj, "generated_transcripts"):
-                    available_langs.extend([t.language_code for t in transcript_obj.generated_transcripts if hasattr(t, "language_code")])
-                if hasattr(transcript_obj, "manually_created_transcripts"):
-                    available_langs.extend([t.language_code for t in transcript_obj.manually_created_transcripts if hasattr(t, "language_code")])
+def get_backend(task: str):
+    """Return this process's backend for an inference task, as configured in INFERENCE_BACKENDS."""
+    name = INFERENCE_BACKENDS.get(task, INFERENCE_BACKEND)
+    if name == "hf":
+        return get_hf_client()
+    if name != "local":
+        raise ValueError(f"Unknown inference backend {name!r} for {task}")
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = LocalBackend(model_params=HF_MODEL_PARAMS)
+                logger.info("Local inference backend ready (threads=%d, batch=%d)", LOCAL_INFERENCE_THREADS, LOCAL_BATCH_SIZE)
+    return backend
 
-                # Prefer English, then any language
-                preferred_langs = ["en"] + available_langs
-                transcript = None
-                for lang in preferred_langs:
-                    try:
-                        transcript = transcript_obj.find_transcript([lang])
-                        if transcript:
-                            break
-                    except Exception:
-                        continue
+def backend_for(model: str):
+    return get_backend(task_for(model))
 
-                if transcript:
-                    # Now fetch the actual transcript content
-                    if hasattr(transcript, "fetch"):
-                        transcript = transcript.fetch()
-                    elif hasattr(transcript, "get_transcript"):
-                        transcript = transcript.get_transcript()
-                    # Now transcript should be the actual transcript object
+def timed_post(client, model: str, inputs, **kwargs):
+    """
+    client.post timed per task and model, with usage noted for the warm-up scheduler.
+    Inside a batch item the call first waits for a slot of the batch fair share.
+    """
+    with inference_slot(), stage_timer(task_for(model), model) as call_span:
+        call_span.set(backend=client.name, items=len(inputs) if isinstance(inputs, list) else 1,
+                      input_chars=sum(map(len, inputs)) if isinstance(inputs, list) else len(inputs))
+        status, data = client.post(model, inputs, **kwargs)
+        call_span.set(status=status)
+    model_warmer.record(model, status)
+    return status, data
+
+def hf_post(model: str, inputs, parameters: dict = None, timeout: int = None):
+    """
+    backend.post through the inference cache. Inference is deterministic for a
+    given (model, parameters, inputs), so successful responses are cached;
+    errors are never stored. Raises HFClientError on transport errors.
+    """
+    client = backend_for(model)
+    key = cache_key(model, client.params_for(model, parameters), inputs)
+    data = inference_cache.get(key)
+    if data is not None:
+        return 200, data
+    status, data = timed_post(client, model, inputs, parameters=parameters, timeout=timeout)
+    if status == 200 and data:
+        inference_cache.set(key, data)
+    return status, data
+
+def call_hf_summarize(text: str):
+    """
+    Summarize text using HF summary model with robust parsing.
+    Retries, backoff and the circuit breaker live in the backend client.
+    """
+    try:
+        status, data = hf_post(HF_SUMMARY_MODEL, text)
+    except HFClientError as e:
+        raise RuntimeError(f"Hugging Face summarization failed: {e}") from e
+    # parse
+    if status == 200:
+        # handle shapes
+        if isinstance(data, list) and len(data) and isinstance(data[0], dict):
+            # some models return [{'summary_text': '...'}]
+            if "summary_text" in data[0]:
+                return data[0]["summary_text"]
+            # other models might use 'generated_text'
+            if "generated_text" in data[0]:
+                return data[0]["generated_text"]
+            # fallback to first value
+            for v in data[0].values():
+                if isinstance(v, str):
+                    return v
+            return str(data[0])
+        if isinstance(data, dict):
+            if "summary_text" in data:
+                return data["summary_text"]
+            if "generated_text" in data:
+                return data["generated_text"]
+            # fallback
+            for v in data.values():
+                if isinstance(v, str):
+                    return v
+            return str(data)
+        if isinstance(data, str):
+            return data
+        return str(data)
+    raise RuntimeError(f"Hugging Face summarization failed ({status}): {str(data)[:200]}")
+
+def translation_model_for(src_lang: str):
+    # sanitize src_lang to simple code (e.g., 'hi' or 'pt' etc.)
+    src = (src_lang or "").split("-")[0].lower()
+    if src in OPUS_MT_SOURCES:
+        return TRANSLATION_MODEL_TEMPLATE.format(src=src)
+    return HF_MULTI_TRANSLATION_MODEL
+
+def parse_translation(data):
+    """Pull the translated string out of one translation result, or None."""
+    if isinstance(data, list) and len(data) and isinstance(data[0], dict):
+        data = data[0]
+    if isinstance(data, dict):
+        # translation models often return {'translation_text': '...'} or {'generated_text': '...' }
+        return data.get("translation_text") or data.get("generated_text") or next((v for v in data.values() if isinstance(v, str)), None)
+    if isinstance(data, str):
+        return data
+    return None
+
+def call_hf_translate_batch(texts, src_lang: str):
+    """
+    Translate several chunks to English in one inference call.
+    Returns a list aligned with `texts` (None where a chunk came back unusable).
+    Raises RuntimeError if the call itself fails. Cached per chunk.
+    """
+    model_name = translation_model_for(src_lang)
+    client = backend_for(model_name)
+    params = client.params_for(model_name)
+    keys = [cache_key(model_name, params, t) for t in texts]
+    raw = [inference_cache.get(k) for k in keys]
+    missing = [i for i, r in enumerate(raw) if r is None]
+    if missing:
+        inputs = [texts[i] for i in missing]
+        status, data = timed_post(client, model_name, inputs[0] if len(inputs) == 1 else inputs)
+        if status == 200 and len(inputs) == 1:
+            data = [data]
+        if status != 200 or not isinstance(data, list) or len(data) != len(missing):
+            raise RuntimeError(f"Translation with {model_name} failed ({status}): {str(data)[:200]}")
+        for i, item in zip(missing, data):
+            raw[i] = item if isinstance(item, list) else [item]
+            inference_cache.set(keys[i], raw[i])
+    return [parse_translation(r) for r in raw]
+
+def parse_sentiment(data):
+    """Pick the top {'label', 'score'} out of one sentiment result, or None."""
+    if isinstance(data, list) and len(data) and isinstance(data[0], list):
+        # Some models return [[{'label': 'POSITIVE', 'score': 0.99}, ...]]
+        if len(data[0]) > 0:
+            return data[0][0]  # Take the top sentiment
+    elif isinstance(data, list) and len(data) and isinstance(data[0], dict):
+        return data[0]
+    elif isinstance(data, dict):
+        return data
+    return None
+
+def call_hf_sentiment(text: str):
+    """
+    Analyze sentiment of text using HF sentiment model.
+    Returns dict with 'label' (e.g., 'POSITIVE', 'NEGATIVE', 'NEUTRAL') and 'score' (confidence).
+    """
+    try:
+        status, data = hf_post(HF_SENTIMENT_MODEL, text)
+        if status == 200:
+            result = parse_sentiment(data)
+            if result:
+                return result
+        logger.warning("Sentiment analysis failed: %s", data)
+        return None
+    except Exception as e:
+        logger.warning("Sentiment analysis exception: %s", e)
+        return None
+
+def call_hf_sentiment_batch(texts):
+    """
+    Analyze sentiment of several texts in one inference call.
+    Returns a list aligned with `texts` of {'label', 'score'} dicts (None where
+    the model gave nothing usable). Raises RuntimeError if the call fails.
+    Results are cached per text under the same key as call_hf_sentiment.
+    """
+    client = backend_for(HF_SENTIMENT_MODEL)
+    params = client.params_for(HF_SENTIMENT_MODEL)
+    keys = [cache_key(HF_SENTIMENT_MODEL, params, t) for t in texts]
+    raw = [inference_cache.get(k) for k in keys]
+    missing = [i for i, r in enumerate(raw) if r is None]
+    if missing:
+        status, data = timed_post(client, HF_SENTIMENT_MODEL, [texts[i] for i in missing])
+        if status != 200 or not isinstance(data, list) or len(data) != len(missing):
+            raise RuntimeError(f"Batched sentiment failed ({status}): {str(data)[:200]}")
+        for i, item in zip(missing, data):
+            # store in the single-input response shape so call_hf_sentiment hits it too
+            raw[i] = [item]
+            inference_cache.set(keys[i], raw[i])
+    return [parse_sentiment(r) for r in raw]
+
+def pack_batches(texts, max_chars: int = None, max_items: int = None):
+    """
+    Group consecutive texts into batches bounded by total characters and item count.
+    Returns a list of index lists; an oversized text gets a batch of its own.
+    """
+    max_chars = max_chars or SENTIMENT_BATCH_CHARS
+    max_items = max_items or SENTIMENT_BATCH_SIZE
+    batches = []
+    current, size = [], 0
+    for i, t in enumerate(texts):
+        n = len(t)
+        if current and (size + n > max_chars or len(current) >= max_items):
+            batches.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += n
+    if current:
+        batches.append(current)
+    return batches
+
+def analyze_mood(time_chunks, progress=no_progress):
+    """
+    Sentiment per time interval, sent as a few batched calls in parallel.
+    A failed batch marks only its own intervals as UNKNOWN.
+    Emits a 'mood' progress event per interval as its batch finishes.
+    """
+    chunks = [c for c in time_chunks if c.get('text', '').strip()]
+    texts = [c['text'].strip() for c in chunks]
+    batches = pack_batches(texts)
+    mood_intervals = [None] * len(chunks)
+
+    def on_batch(b, ok, value):
+        if not ok:
+            logger.warning("Sentiment batch of %d intervals failed: %s", len(batches[b]), value)
+        for j, i in enumerate(batches[b]):
+            sentiment = value[j] if ok else None
+            mood_intervals[i] = {
+                'start': chunks[i]['start'],
+                'end': chunks[i]['end'],
+                'mood': sentiment.get('label', 'UNKNOWN') if sentiment else 'UNKNOWN',
+                'score': sentiment.get('score', 0.0) if sentiment else 0.0
+            }
+            progress("mood", mood_intervals[i])
+
+    parallel_map(lambda idx: call_hf_sentiment_batch([texts[i] for i in idx]), batches, on_result=on_batch)
+    logger.info("Mood analysis: %d intervals in %d batched calls", len(chunks), len(batches))
+    return mood_intervals
+
+def chunk_transcript_by_time(transcript, interval_seconds=30, start_time=None, end_time=None):
+    """
+    Chunk transcript into time intervals, optionally only segments starting in [start_time, end_time).
+    transcript: TranscriptIndex (or a list of dicts with 'start', 'duration', 'text')
+    Returns list of dicts: [{'start': 0, 'end': 30, 'text': '...'}, ...]
+    """
+    index = transcript if isinstance(transcript, TranscriptIndex) else TranscriptIndex.from_segments(transcript or [])
+    return [{'start': start, 'end': end, 'text': index.slice(i, j)}
+            for start, end, i, j in index.intervals(interval_seconds, start_time, end_time)]
+
+# ---------------- transcripts ----------------
+class TranscriptError(PipelineError):
+    """Transcript could not be fetched; `cacheable` marks failures worth negative caching."""
+
+    def __init__(self, payload: dict, status: int = 500, cacheable: bool = False):
+        super().__init__(payload, status)
+        self.cacheable = cacheable
+
+def is_known_transcript_error(exc):
+    """True for youtube_transcript_api errors that will not go away on retry (disabled, missing, unavailable)."""
+    known = tuple(t for t in (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) if t is not None)
+    return bool(known) and isinstance(exc, known)
+
+def is_transport_error(exc):
+    """True for network failures and refused YouTube requests, which may succeed later and say nothing about the video."""
+    transient = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError)
+    return isinstance(exc, transient + YT_REQUEST_ERRORS)
+
+class TranscriptProvider:
+    """
+    Binds the youtube_transcript_api entry point once per process.
+    The installed library version is inspected at import time (no network)
+    and the first usable callable, in the same preference order the route
+    used to probe, becomes the fast path. Other candidates are only tried if
+    the fast path fails for a reason other than a known transcript error
+    or a transport error, and a fallback that works is promoted for later
+    requests. Bindings of the same underlying function are tried once. A
+    language-filtered call that finds no transcript in the default languages
+    falls through to the listing calls, which see every language.
+    """
+
+    INSTANCE_METHODS = ("fetch", "list", "get_transcript", "get_transcripts", "list_transcripts")
+    CLASS_METHODS = ("get_transcript", "get_transcripts", "fetch", "list", "list_transcripts")
+    MODULE_FUNCTIONS = ("get_transcript", "get_transcripts", "fetch_transcript", "list_transcripts")
+    API_FUNCTIONS = ("fetch", "list", "get_transcript", "get_transcripts")
+    # these take a list of video IDs and return ({video_id: transcript}, failed_ids)
+    LIST_INPUT = ("get_transcripts",)
+    # these only return the requested languages (English by default); list/list_transcripts return every language
+    LANGUAGE_FILTERED = ("fetch", "get_transcript", "get_transcripts", "fetch_transcript")
+
+    def __init__(self):
+        self.candidates = []
+        self.import_error = None
+        self._lock = threading.Lock()
+        self.resolve()
+
+    @property
+    def strategy(self):
+        return self.candidates[0][0] if self.candidates else None
+
+    def resolve(self):
+        candidates = []
+        try:
+            yt_mod = importlib.import_module("youtube_transcript_api")
+        except Exception as e:
+            logger.warning("youtube_transcript_api not importable: %s", e)
+            self.import_error = e
+            self.candidates = []
+            return
+        YTClass = getattr(yt_mod, "YouTubeTranscriptApi", None)
+        if YTClass:
+            inst = None
+            try:
+                inst = YTClass()
+            except Exception as e:
+                logger.debug("Could not instantiate YouTubeTranscriptApi: %s", e)
+            if inst is not None:
+                candidates += self._collect("inst", inst, self.INSTANCE_METHODS)
+            candidates += self._collect("YTClass", YTClass, self.CLASS_METHODS)
+        candidates += self._collect("module", yt_mod, self.MODULE_FUNCTIONS)
+        try:
+            candidates += self._collect("_api", importlib.import_module("youtube_transcript_api._api"), self.API_FUNCTIONS)
+        except Exception as e:
+            logger.debug("_api import failed: %s", e)
+        # inst.x and YTClass.x are often the same classmethod; keep only the first binding of each function
+        seen = set()
+        self.candidates = []
+        for candidate in candidates:
+            func = getattr(candidate[1], "__func__", candidate[1])
+            if func not in seen:
+                seen.add(func)
+                self.candidates.append(candidate)
+        logger.info("Transcript strategy: %s (%d fallbacks)", self.strategy, max(0, len(candidates) - 1))
+
+    def _collect(self, prefix, owner, names):
+        out = []
+        for name in names:
+            fn = getattr(owner, name, None)
+            if callable(fn):
+                out.append((f"{prefix}.{name}", fn, name in self.LIST_INPUT))
+        return out
+
+    def _call(self, fn, takes_list, video_id):
+        if not takes_list:
+            return fn(video_id)
+        result = fn([video_id])
+        if isinstance(result, tuple) and result and isinstance(result[0], dict):
+            return result[0].get(video_id)
+        return result
+
+    def fetch(self, video_id: str, tried: list = None):
+        """
+        Fetch the raw transcript object for `video_id` using the bound strategy.
+        Appends every strategy attempted to `tried`; raises TranscriptError on failure.
+        """
+        tried = tried if tried is not None else []
+        if self.import_error is not None:
+            raise TranscriptError({"error": "youtube_transcript_api not installed or failed to import", "detail": str(self.import_error)})
+        candidates = list(self.candidates)
+        errors = []
+        language_miss = False
+        for i, (label, fn, takes_list) in enumerate(candidates):
+            filtered = label.rsplit(".", 1)[-1] in self.LANGUAGE_FILTERED
+            if language_miss and filtered:
+                continue
+            tried.append(label)
+            try:
+                with span("transcript_probe", strategy=label):
+                    result = self._call(fn, takes_list, video_id)
+            except Exception as e:
+                logger.warning("%s failed: %s", label, e)
+                errors.append(e)
+                if filtered and NoTranscriptFound is not None and isinstance(e, NoTranscriptFound):
+                    # no transcript in the default languages; a listing call still sees the others
+                    language_miss = True
+                    continue
+                if is_known_transcript_error(e):
+                    # the video itself is the problem; other call shapes will fail the same way
+                    break
+                if is_transport_error(e):
+                    # YouTube is unreachable or refusing us; other call shapes only add load
+                    break
+                continue
+            if result is None:
+                continue
+            if i > 0 and not language_miss:
+                with self._lock:
+                    # promote the working fallback so later requests make a single attempt
+                    if self.candidates and self.candidates[0][0] == candidates[0][0]:
+                        self.candidates = [candidates[i]] + [c for c in self.candidates if c[0] != label]
+                logger.info("Transcript strategy switched to %s", label)
+            return result
+        payload = {"error": "Failed to fetch transcript — see server logs for attempted methods", "tried": tried}
+        if errors:
+            payload["detail"] = str(errors[-1])
+        # negative-cache only a definite answer about the video, never one reached after a network failure
+        cacheable = bool(errors) and is_known_transcript_error(errors[-1]) and not any(is_transport_error(e) for e in errors)
+        raise TranscriptError(payload, cacheable=cacheable)
+
+    def describe(self):
+        return {
+            "strategy": self.strategy,
+            "fallbacks": [c[0] for c in self.candidates[1:]],
+            "import_error": str(self.import_error) if self.import_error else None,
+        }
+
+transcript_provider = TranscriptProvider()
+
+class TranscriptIndex:
+    """
+    Compact transcript: segment starts and durations in float arrays and all
+    text in one buffer, segments joined by a single space, with an offset
+    array into it. Blank segments are dropped and segments are ordered by
+    start, so time ranges resolve with a binary search and the text of any
+    run of segments is a single slice of the buffer.
+    """
+
+    __slots__ = ("starts", "durations", "offsets", "text")
+
+    def __init__(self, starts, durations, offsets, text: str):
+        self.starts = starts
+        self.durations = durations
+        # offsets[i] is where segment i begins; offsets[n] = len(text) + 1
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Build from an iterable of {'start', 'duration', 'text'} dicts."""
+        rows = []
+        for item in segments:
+            text = (item.get('text') or '').strip()
+            if text:
+                rows.append((float(item.get('start') or 0), float(item.get('duration') or 0), text))
+        if any(rows[i][0] > rows[i + 1][0] for i in range(len(rows) - 1)):
+            rows.sort(key=lambda r: r[0])
+        starts, durations, offsets = array('d'), array('d'), array('q')
+        pos = 0
+        for start, duration, text in rows:
+            starts.append(start)
+            durations.append(duration)
+            offsets.append(pos)
+            pos += len(text) + 1
+        offsets.append(pos)
+        return cls(starts, durations, offsets, " ".join(r[2] for r in rows))
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def end_time(self):
+        return max((s + d for s, d in zip(self.starts, self.durations)), default=0.0)
+
+    def locate(self, start_time: float = None, end_time: float = None):
+        """Segment index range [i, j) of segments starting within [start_time, end_time)."""
+        i = 0 if start_time is None else bisect.bisect_left(self.starts, start_time)
+        j = len(self) if end_time is None else bisect.bisect_left(self.starts, end_time, i)
+        return i, j
+
+    def slice(self, i: int, j: int):
+        """Text of segments i..j-1 as one slice of the buffer."""
+        if j <= i:
+            return ""
+        return self.text[self.offsets[i]:self.offsets[j] - 1]
+
+    def text_between(self, start_time: float = None, end_time: float = None):
+        return self.slice(*self.locate(start_time, end_time))
+
+    def intervals(self, seconds: float, start_time: float = None, end_time: float = None):
+        """
+        Yield (start, end, i, j) for each fixed interval, aligned to multiples
+        of `seconds` from zero, that has at least one segment starting in it.
+        Only segments starting within [start_time, end_time) are included.
+        """
+        i, n = self.locate(start_time, end_time)
+        while i < n:
+            k = math.floor(self.starts[i] / seconds)
+            start = k * seconds
+            j = min(n, bisect.bisect_left(self.starts, start + seconds, i + 1))
+            yield start, start + seconds, i, j
+            i = j
+
+    def to_dict(self):
+        """JSON-safe form for the transcript cache; arrays travel as base64 bytes."""
+        return {
+            "starts": base64.b64encode(self.starts.tobytes()).decode("ascii"),
+            "durations": base64.b64encode(self.durations.tobytes()).decode("ascii"),
+            "offsets": base64.b64encode(self.offsets.tobytes()).decode("ascii"),
+            "text": self.text,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        arrays = []
+        for name, code in (("starts", 'd'), ("durations", 'd'), ("offsets", 'q')):
+            a = array(code)
+            a.frombytes(base64.b64decode(data[name]))
+            arrays.append(a)
+        return cls(*arrays, data["text"])
+
+def normalize_transcript(transcript_obj):
+    """
+    Turn whatever the transcript API returned into a list of
+    {'start', 'duration', 'text'} dicts. Returns (transcript_list, language_or_None).
+    """
+    transcript_list = []
+    transcript_language = None
+
+    try:
+        # Handle TranscriptList: try to find and fetch a transcript
+        if hasattr(transcript_obj, "find_transcript"):
+            # TranscriptList - try to get the first available transcript
+            try:
+                # Try to find transcript in preferred languages: English first, then any available
+                available_langs = []
+                if hasattr(transcript_obj, "generated_transcripts"):
+                    available_langs.extend([t.language_code for t in transcript_obj.generated_transcripts if hasattr(t, "language_code")])
+                if hasattr(transcript_obj, "manually_created_transcripts"):
+                    available_langs.extend([t.language_code for t in transcript_obj.manually_created_transcripts if hasattr(t, "language_code")])
+
+                # Prefer English, then any language
+                preferred_langs = ["en"] + available_langs
+                transcript = None
+                for lang in preferred_langs:
+                    try:
+                        transcript = transcript_obj.find_transcript([lang])
+                        if transcript:
+                            break
+                    except Exception:
+                        continue
+
+                if transcript:
+                    # Now fetch the actual transcript content
+                    if hasattr(transcript, "fetch"):
+                        transcript = transcript.fetch()
+                    elif hasattr(transcript, "get_transcript"):
+                        transcript = transcript.get_transcript()
+                    # Now transcript should be the actual transcript object
                     transcript_obj = transcript
                     logger.info("Fetched transcript from TranscriptList")
                 else:
@@ -595,124 +1977,1590 @@ def summarize_youtube():
 
     except Exception as e:
         logger.exception("Error normalizing transcript object: %s", e)
-        return jsonify({"error": "Error normalizing transcript", "detail": str(e)}), 500
+        raise TranscriptError({"error": "Error normalizing transcript", "detail": str(e)})
+
+    return transcript_list, transcript_language
+
+def fetch_transcript(video_id: str):
+    """
+    Fetch and normalize the transcript for `video_id` from YouTube.
+    Returns {'transcript': TranscriptIndex, 'language': code_or_None, 'tried': [...]}.
+    Raises TranscriptError on failure.
+    """
+    tried_methods = []
+    transcript_obj = transcript_provider.fetch(video_id, tried_methods)
+    with span("transcript_normalize") as normalize:
+        transcript_list, transcript_language = normalize_transcript(transcript_obj)
+        index = TranscriptIndex.from_segments(transcript_list)
+        normalize.set(segments=len(index), characters=len(index.text))
 
     if not transcript_list:
         logger.error("Transcript fetched but no text extracted. Raw type: %s", type(transcript_obj))
-        return jsonify({"error": "Transcript fetched but no text could be extracted", "raw_type": str(type(transcript_obj))}), 500
+        raise TranscriptError({"error": "Transcript fetched but no text could be extracted", "raw_type": str(type(transcript_obj))})
+
+    return {"transcript": index, "language": transcript_language, "tried": tried_methods}
+
+transcript_cache = TieredCache("transcripts", max_items=YT_TRANSCRIPT_CACHE_SIZE)
+
+def get_transcript(video_id: str):
+    """
+    fetch_transcript with a per-video cache. Successful fetches are kept for
+    YT_TRANSCRIPT_TTL seconds; known permanent failures are cached for
+    YT_TRANSCRIPT_NEGATIVE_TTL so bad IDs stop reaching YouTube.
+    The index is cached in its compact form. Adds 'cached': bool to the result.
+    """
+    entry = transcript_cache.get(video_id)
+    if entry is not None:
+        if "error" in entry:
+            raise TranscriptError(entry["error"], entry["status"], cacheable=True)
+        if "index" in entry:
+            index = TranscriptIndex.from_dict(entry["index"])
+        else:
+            # written before the index existed
+            index = TranscriptIndex.from_segments(entry["transcript"])
+        return {"transcript": index, "language": entry["language"], "tried": entry["tried"], "cached": True}
+    try:
+        with stage_timer("transcript_fetch"):
+            result = fetch_transcript(video_id)
+    except TranscriptError as e:
+        if e.cacheable and YT_TRANSCRIPT_NEGATIVE_TTL > 0:
+            transcript_cache.set(video_id, {"error": e.payload, "status": e.status}, ttl=YT_TRANSCRIPT_NEGATIVE_TTL)
+        raise
+    if YT_TRANSCRIPT_TTL > 0:
+        transcript_cache.set(video_id, {"index": result["transcript"].to_dict(), "language": result["language"],
+                                        "tried": result["tried"]}, ttl=YT_TRANSCRIPT_TTL)
+    return {**result, "cached": False}
+
+# ---------------- language id ----------------
+# scripts that identify a language on their own; checked in order (kana before Han)
+SCRIPT_LANGUAGES = [
+    ("ko", re.compile(r"[\uac00-\ud7af\u1100-\u11ff]")),
+    ("ja", re.compile(r"[\u3040-\u30ff]")),
+    ("zh", re.compile(r"[\u4e00-\u9fff]")),
+    ("ru", re.compile(r"[\u0400-\u04ff]")),
+    ("ar", re.compile(r"[\u0600-\u06ff]")),
+    ("hi", re.compile(r"[\u0900-\u097f]")),
+    ("bn", re.compile(r"[\u0980-\u09ff]")),
+    ("th", re.compile(r"[\u0e00-\u0e7f]")),
+    ("he", re.compile(r"[\u0590-\u05ff]")),
+    ("el", re.compile(r"[\u0370-\u03ff]")),
+]
+UKRAINIAN_LETTERS = re.compile(r"[іїєґІЇЄҐ]")
+# Japanese is spotted by its kana but written in kana and kanji together
+JAPANESE_LETTERS = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+_LANGID_NON_WORD = re.compile(r"[^\w']+")
+_LANGID_DIGITS = re.compile(r"[\d_]+")
+
+def _load_langid_model(path: str = LANGID_MODEL_PATH):
+    """
+    Load trigram profiles into (languages, floors, index) where index maps each
+    trigram to [(language_position, logprob - floor), ...] so scoring only
+    touches the languages that actually contain a trigram.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+        profiles, floors = model["profiles"], model["floors"]
+    except Exception as e:
+        logger.warning("Language id model unavailable (%s); falling back to script detection only", e)
+        return [], [], {}
+    languages = sorted(profiles)
+    index = {}
+    for pos, lang in enumerate(languages):
+        for g, logprob in profiles[lang].items():
+            index.setdefault(g, []).append((pos, logprob - floors[lang]))
+    return languages, [floors[lang] for lang in languages], index
+
+LANGID_LANGUAGES, LANGID_FLOORS, LANGID_INDEX = _load_langid_model()
+
+def _langid_trigrams(text: str):
+    text = _LANGID_DIGITS.sub(" ", _LANGID_NON_WORD.sub(" ", text.lower()))
+    grams = {}
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            g = padded[i:i + 3]
+            grams[g] = grams.get(g, 0) + 1
+    return grams
+
+def detect_language(text: str, sample_chars: int = LANGID_SAMPLE_CHARS):
+    """
+    Identify the language of `text` offline from a leading sample.
+    Non-Latin scripts are recognized by Unicode range; Latin-script text is
+    scored against the character trigram profiles in langid_model.json, and
+    rejected when too few of its trigrams occur in the winning profile.
+    Returns (language_code, confidence) or (None, 0.0).
+    """
+    sample = (text or "")[:sample_chars]
+    letters = sum(1 for ch in sample if ch.isalpha())
+    if not letters:
+        return None, 0.0
+    for lang, pattern in SCRIPT_LANGUAGES:
+        hits = len(pattern.findall(sample))
+        if hits / letters >= 0.3:
+            if lang == "ru" and UKRAINIAN_LETTERS.search(sample):
+                lang = "uk"
+            elif lang == "ja":
+                hits = len(JAPANESE_LETTERS.findall(sample))
+            return lang, round(min(1.0, hits / letters), 3)
+    grams = _langid_trigrams(sample)
+    if not grams or not LANGID_LANGUAGES:
+        return None, 0.0
+    total = sum(grams.values())
+    scores = [floor * total for floor in LANGID_FLOORS]
+    for g, n in grams.items():
+        for pos, delta in LANGID_INDEX.get(g, ()):
+            scores[pos] += n * delta
+    best = max(range(len(scores)), key=scores.__getitem__)
+    # the posterior only ranks known languages; text in an unprofiled language
+    # still picks a winner, but few of its trigrams appear in that profile
+    covered = sum(n for g, n in grams.items() if any(pos == best for pos, _ in LANGID_INDEX.get(g, ())))
+    if covered / total < LANGID_MIN_COVERAGE:
+        return None, 0.0
+    # naive Bayes posterior with a uniform prior
+    norm = sum(math.exp(v - scores[best]) for v in scores)
+    return LANGID_LANGUAGES[best], round(1.0 / norm, 3)
+
+# ---------------- pdf ----------------
+def spool_upload(file_storage, chunk_size: int = 1024 * 1024):
+    """
+    Copy an upload to a temp file in fixed-size blocks, hashing as it goes.
+    Returns (path, sha256_hex, size); the caller owns and must delete the file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = file_storage.stream.read(chunk_size)
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+                out.write(block)
+    except Exception:
+        remove_quietly(path)
+        raise
+    return path, digest.hexdigest(), size
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def pdf_page_keys(path: str):
+    """
+    Content hash per page, computed without text extraction: the page's
+    content stream plus its font and image references. A key that changes
+    only costs a re-extraction, so erring towards misses is safe.
+    """
+    keys = []
+    with fitz.open(path) as doc:
+        for page in doc:
+            digest = hashlib.sha256(page.read_contents() or b"")
+            digest.update(repr((page.get_fonts(), page.get_images(), page.get_xobjects(), tuple(page.rect))).encode())
+            keys.append(digest.hexdigest())
+    return keys
+
+_pdf_pool = None
+_pdf_pool_pid = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    """Per-process extraction pool (spawned, so forking a threaded worker is never needed), or None."""
+    global _pdf_pool, _pdf_pool_pid
+    if PDF_EXTRACT_PROCESSES <= 0:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None or _pdf_pool_pid != os.getpid():
+            try:
+                _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_PROCESSES,
+                                                mp_context=multiprocessing.get_context("spawn"))
+                _pdf_pool_pid = os.getpid()
+            except Exception as e:
+                logger.warning("PDF process pool unavailable, extracting in-process: %s", e)
+                return None
+        return _pdf_pool
+
+def reset_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+def iter_pdf_pages(path: str, page_numbers):
+    """
+    Yield the texts of `page_numbers` in order. Large sets are split into
+    tasks of PDF_PAGES_PER_TASK pages extracted in the process pool, with a
+    bounded window of tasks in flight.
+    """
+    page_numbers = list(page_numbers)
+    pool = get_pdf_pool() if len(page_numbers) > PDF_PAGES_PER_TASK else None
+    if pool is None:
+        yield from extract_pages(path, page_numbers)
+        return
+    tasks = [page_numbers[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(page_numbers), PDF_PAGES_PER_TASK)]
+    window = max(2, PDF_EXTRACT_PROCESSES * 2)
+    pending = []
+    next_task = 0
+    done_pages = 0
+    try:
+        while pending or next_task < len(tasks):
+            while next_task < len(tasks) and len(pending) < window:
+                pending.append(pool.submit(extract_pages, path, tasks[next_task]))
+                next_task += 1
+            texts = pending.pop(0).result()
+            done_pages += len(texts)
+            yield from texts
+    except BrokenProcessPool as e:
+        logger.warning("PDF process pool broke after %d pages, finishing in-process: %s", done_pages, e)
+        reset_pdf_pool()
+        yield from extract_pages(path, page_numbers[done_pages:])
+
+pdf_cache = TieredCache("pdf", max_items=PDF_CACHE_SIZE)
+
+def iter_pdf_page_texts(path: str, page_keys):
+    """
+    Yield (page_index, text, reused) in page order. Pages whose content key
+    is cached skip extraction; the rest are extracted lazily.
+    """
+    cached = [pdf_cache.get(f"text:{k}") for k in page_keys]
+    extracted = iter_pdf_pages(path, [i for i, t in enumerate(cached) if t is None])
+    for i, key in enumerate(page_keys):
+        if cached[i] is not None:
+            yield i, cached[i], True
+            continue
+        with stage_timer("pdf_extract"):
+            text = next(extracted)
+        pdf_cache.set(f"text:{key}", text, ttl=PDF_CACHE_TTL)
+        yield i, text, False
+
+def iter_page_groups(pages, min_chars: int = None, max_chars: int = None):
+    """
+    Group consecutive pages by content: a group ends once it holds at least
+    `min_chars` of text and its last page's text hash is 0 mod
+    PDF_GROUP_BOUNDARY_DIVISOR, or once it reaches `max_chars`. Chunks never
+    span a group boundary, and since boundaries depend on page text rather
+    than position, inserting or editing a page only disturbs the groups
+    around it. Yields lists of (page_index, text, reused).
+    """
+    min_chars = min_chars or PDF_MIN_GROUP_CHARS
+    max_chars = max(min_chars, max_chars or PDF_MAX_GROUP_CHARS)
+    group, size = [], 0
+    for page in pages:
+        text = page[1].strip()
+        group.append(page)
+        size += len(text)
+        boundary = zlib.crc32(text.encode("utf-8")) % PDF_GROUP_BOUNDARY_DIVISOR == 0
+        if (size >= min_chars and boundary) or size >= max_chars:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+# ---------------- map-reduce ----------------
+def parallel_map(fn, items, max_workers: int = None, on_result=None):
+    """
+    Apply `fn` to every item using a bounded thread pool, preserving input order.
+    Returns list of (ok, value) tuples; value is the exception when ok is False,
+    so one failing item never aborts the others.
+    `on_result(index, ok, value)` is called in completion order as items finish.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = max(1, min(max_workers or HF_MAX_CONCURRENCY, len(items)))
 
-    # Extract text for summarization
-    text_pieces = [item['text'] for item in transcript_list if item['text'].strip()]
-    transcript_text = " ".join(text_pieces).strip()
+    def _safe(item):
+        try:
+            return True, fn(item)
+        except Exception as e:
+            return False, e
+
+    results = [None] * len(items)
+    if workers == 1:
+        for i, it in enumerate(items):
+            results[i] = _safe(it)
+            if on_result:
+                on_result(i, *results[i])
+        return results
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hf-map") as pool:
+        futures = {pool.submit(in_context(_safe), it): i for i, it in enumerate(items)}
+        for f in as_completed(futures):
+            i = futures[f]
+            results[i] = f.result()
+            if on_result:
+                on_result(i, *results[i])
+    return results
+
+def summarize_chunks(chunks, progress=no_progress):
+    """
+    Map phase: summarize chunks concurrently.
+    Returns (summaries, failed) where summaries keeps the order of the successful
+    chunks and failed is a list of {'index', 'error'} dicts.
+    Emits a 'chunk' progress event as each chunk finishes.
+    """
+    total = len(chunks)
+
+    def on_chunk(i, ok, value):
+        if ok:
+            progress("chunk", {"index": i, "total": total, "summary": value})
+        else:
+            progress("chunk", {"index": i, "total": total, "error": str(value)})
+
+    summaries = []
+    failed = []
+    for i, (ok, value) in enumerate(parallel_map(call_hf_summarize, chunks, on_result=on_chunk)):
+        if ok:
+            summaries.append(value)
+        else:
+            logger.warning("Chunk %d summarization failed: %s", i, value)
+            failed.append({"index": i, "error": str(value)})
+    return summaries, failed
+
+def summarize_chunk_groups(groups, progress=no_progress, cache=None, ttl: float = None, summarize=call_hf_summarize,
+                           cacheable=None):
+    """
+    Map phase over a lazy iterator of (group_key, chunks). A group whose key
+    is in `cache` reuses its stored chunk summaries; other chunks are
+    submitted to `summarize` as soon as their group is produced, so inference
+    overlaps with whatever is still generating groups (e.g. PDF extraction).
+    Groups that summarize without failures, and for which `cacheable(key)`
+    holds, are written back to `cache`.
+    Returns (summaries, failed, chunk_count, reused_chunks).
+    """
+    entries = []
+    fresh = []
+    reused = 0
+    with ThreadPoolExecutor(max_workers=HF_MAX_CONCURRENCY, thread_name_prefix="hf-map") as pool:
+        def report(i, f):
+            try:
+                progress("chunk", {"index": i, "total": None, "summary": f.result()})
+            except Exception as e:
+                progress("chunk", {"index": i, "total": None, "error": str(e)})
+
+        for key, chunks in groups:
+            stored = cache.get(key) if cache is not None and key else None
+            if stored is not None:
+                for summary in stored:
+                    progress("chunk", {"index": len(entries), "total": None, "summary": summary, "reused": True})
+                    entries.append(summary)
+                reused += len(stored)
+                continue
+            futures = []
+            for chunk in chunks:
+                i = len(entries)
+                f = pool.submit(in_context(summarize), chunk)
+                f.add_done_callback(lambda f, i=i: report(i, f))
+                futures.append(f)
+                entries.append(f)
+            fresh.append((key, futures))
+        summaries, failed = [], []
+        for i, entry in enumerate(entries):
+            if isinstance(entry, str):
+                summaries.append(entry)
+                continue
+            try:
+                summaries.append(entry.result())
+            except Exception as e:
+                logger.warning("Chunk %d summarization failed: %s", i, e)
+                failed.append({"index": i, "error": str(e)})
+    if cache is not None:
+        for key, futures in fresh:
+            if not key or not futures or (cacheable and not cacheable(key)):
+                continue
+            if all(f.exception() is None for f in futures):
+                cache.set(key, [f.result() for f in futures], ttl=ttl)
+    return summaries, failed, len(entries), reused
+
+def map_reduce_summarize(chunks, progress=no_progress):
+    """
+    Summarize chunks in parallel, then merge the partial summaries into one.
+    Returns (final_summary, stats). Raises RuntimeError only if every chunk failed.
+    """
+    with span("map", chunks=len(chunks)):
+        summaries, failed = summarize_chunks(chunks, progress)
+    return reduce_summaries(summaries, failed, len(chunks), progress)
+
+def reduce_summaries(summaries, failed, total_chunks, progress=no_progress):
+    """
+    Tree reduce: pack partial summaries into groups that fit the
+    REDUCE_MAX_CHARS input budget, summarize the groups in parallel, and
+    repeat on the results until one summary is left. A failed group is
+    dropped as long as another group at the same level succeeded.
+    Returns (final_summary, stats); stats['reduce'] has depth and per-level fan-out.
+    """
+    if not summaries:
+        detail = failed[0]["error"] if failed else "no chunks to summarize"
+        raise RuntimeError(f"All chunk summaries failed: {detail}")
+    level = list(summaries)
+    fan_out = []
+    failed_groups = 0
+    with span("reduce", partials=len(level)):
+        while len(level) > 1:
+            groups = pack_batches(level, max_chars=REDUCE_MAX_CHARS, max_items=len(level))
+            if len(groups) == len(level):
+                # every partial already fills the budget on its own; merge pairwise
+                groups = [list(range(i, min(i + 2, len(level)))) for i in range(0, len(level), 2)]
+            fan_out.append(len(groups))
+            progress("reduce", {"level": len(fan_out), "partials": len(level), "groups": len(groups)})
+            with span("reduce_level", level=len(fan_out), partials=len(level), groups=len(groups)):
+                outcomes = parallel_map(lambda idx: call_hf_summarize("\n".join(level[i] for i in idx)), groups)
+            merged = [value for ok, value in outcomes if ok]
+            errors = [value for ok, value in outcomes if not ok]
+            if not merged:
+                raise RuntimeError(f"Reduce level {len(fan_out)} failed: {errors[0]}")
+            for e in errors:
+                logger.warning("Reduce group failed at level %d: %s", len(fan_out), e)
+            failed_groups += len(errors)
+            level = merged
+    stats = {
+        "chunks": total_chunks,
+        "failed_chunks": failed,
+        "reduce": {"depth": len(fan_out), "fan_out": fan_out, "failed_groups": failed_groups},
+    }
+    return level[0], stats
+
+def translate_and_summarize(text: str, src_lang: str, progress=no_progress):
+    """
+    Pipelined translate -> summarize. Text is cut into translation-sized chunks,
+    translated TRANSLATION_BATCH_SIZE at a time with at most TRANSLATION_WINDOW
+    batches in flight, and each translated chunk is queued for summarization
+    as soon as its batch returns, so the two stages overlap. Chunks whose translation failed are summarized in the original language.
+    Returns (final_summary, stats) with translated/untranslated chunk counts.
+    """
+    with stage_timer("chunking"):
+        chunks = chunk_text(text, max_chars=TRANSLATION_CHUNK_CHARS, overlap=100)
+    if not chunks:
+        raise RuntimeError("no chunks to summarize")
+    total = len(chunks)
+
+    def report(i, f):
+        try:
+            progress("chunk", {"index": i, "total": total, "summary": f.result(), "translated": flags[i]})
+        except Exception as e:
+            progress("chunk", {"index": i, "total": total, "error": str(e)})
+
+    batches = [list(range(i, min(i + TRANSLATION_BATCH_SIZE, len(chunks)))) for i in range(0, len(chunks), TRANSLATION_BATCH_SIZE)]
+    flags = [False] * len(chunks)
+    summary_futures = [None] * len(chunks)
+    with span("translate_and_map", chunks=total, source_language=src_lang), \
+            ThreadPoolExecutor(max_workers=max(1, HF_MAX_CONCURRENCY), thread_name_prefix="hf-pipe") as pool:
+        def translate_batch(idx):
+            try:
+                translated = call_hf_translate_batch([chunks[i] for i in idx], src_lang)
+            except Exception as e:
+                logger.warning("Translation batch of %d chunks failed: %s", len(idx), e)
+                translated = [None] * len(idx)
+            for i, t in zip(idx, translated):
+                flags[i] = bool(t)
+                summary_futures[i] = pool.submit(in_context(call_hf_summarize), t or chunks[i])
+                summary_futures[i].add_done_callback(lambda f, i=i: report(i, f))
+
+        # a bounded window of translation batches: each finished batch queues its summaries
+        # ahead of the next batch, so the pool never holds every translation before any summary
+        pending = iter(batches)
+        in_flight = set()
+        while True:
+            for idx in itertools.islice(pending, TRANSLATION_WINDOW - len(in_flight)):
+                in_flight.add(pool.submit(in_context(translate_batch), idx))
+            if not in_flight:
+                break
+            done, in_flight = wait_futures(in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                f.result()
+        summaries, failed = [], []
+        for i, f in enumerate(summary_futures):
+            try:
+                summaries.append(f.result())
+            except Exception as e:
+                logger.warning("Chunk %d summarization failed: %s", i, e)
+                failed.append({"index": i, "error": str(e)})
+    final, stats = reduce_summaries(summaries, failed, len(chunks), progress)
+    stats["translated_chunks"] = sum(flags)
+    stats["untranslated_chunks"] = len(chunks) - sum(flags)
+    return final, stats
+
+segment_cache = TieredCache("yt_segments", max_items=YT_SEGMENT_CACHE_SIZE)
+
+def transcript_segments(index, start_time: float = None, end_time: float = None, seconds: int = YT_SEGMENT_SECONDS):
+    """
+    Yield (start, end, text) for the fixed `seconds`-long segments, aligned
+    to multiples of `seconds` from zero, that overlap [start_time, end_time)
+    and contain any text.
+    """
+    if not len(index):
+        return
+    first = math.floor((start_time or 0) / seconds)
+    # clamped to the transcript, so an end far past the video costs nothing
+    last = math.floor(index.starts[-1] / seconds) + 1
+    if end_time is not None:
+        last = min(last, math.ceil(end_time / seconds))
+    for k in range(first, last):
+        text = index.text_between(k * seconds, (k + 1) * seconds)
+        if text:
+            yield k * seconds, (k + 1) * seconds, text
+
+def summarize_transcript_range(index, start_time: float = None, end_time: float = None, translation_src: str = None,
+                               mode: str = "", progress=no_progress):
+    """
+    Summarize the YT_SEGMENT_SECONDS segments overlapping [start_time, end_time).
+    Chunk summaries are cached per segment by content, so moving or widening
+    the range only maps segments not seen before and then re-runs the reduce.
+    Chunks of a non-English transcript are translated one by one before
+    summarizing and fall back to the original text if that fails; a segment
+    with such a chunk is not cached, so only fully translated ones are reused.
+    Returns (final_summary, stats); stats['range'] is the segment-aligned span covered
+    and, for mode=fast, stats['compression'] totals every segment's compression.
+    """
+    translate = translation_src if translation_src and translation_src != "en" else None
+    translated = []
+    untranslated_keys = set()
+    covered = []
+    compressions = []
+
+    def summarize(item):
+        key, chunk = item
+        if translate:
+            try:
+                text = call_hf_translate_batch([chunk], translate)[0]
+            except Exception as e:
+                logger.warning("Segment chunk translation failed: %s", e)
+                text = None
+            translated.append(bool(text))
+            if not text:
+                untranslated_keys.add(key)
+            chunk = text or chunk
+        return call_hf_summarize(chunk)
+
+    def segment_chunks(key, text, compressed=None):
+        # a generator, so a segment served from the cache is never compressed or split
+        if compressed is None:
+            compressed, _ = compress_for_mode(text, mode, progress)
+        text = compressed
+        with stage_timer("chunking"):
+            if translate:
+                chunks = chunk_text(text, max_chars=TRANSLATION_CHUNK_CHARS, overlap=100)
+            else:
+                chunks = chunk_text(text, max_chars=3000, overlap=200)
+        for chunk in chunks:
+            yield key, chunk
+
+    def groups():
+        for start, end, text in transcript_segments(index, start_time, end_time):
+            covered.append((start, end))
+            progress("segment", {"start": start, "end": end, "characters": len(text)})
+            # v2: entries written before untranslated segments were excluded may hold source-language summaries
+            key = "segments:v2:" + cache_key(HF_SUMMARY_MODEL, translate, mode, hashlib.sha256(text.encode("utf-8")).hexdigest())
+            compressed = None
+            if mode == "fast":
+                # stats are kept beside the summaries so a reused segment still reports them
+                stats = segment_cache.get(key + ":compression")
+                if stats is None:
+                    compressed, stats = compress_for_mode(text, mode, progress)
+                    segment_cache.set(key + ":compression", stats, ttl=YT_SEGMENT_CACHE_TTL)
+                compressions.append(stats)
+            yield key, segment_chunks(key, text, compressed)
+
+    with span("map", source="transcript_segments") as map_span:
+        summaries, failed, chunk_count, chunks_reused = summarize_chunk_groups(
+            groups(), progress, cache=segment_cache, ttl=YT_SEGMENT_CACHE_TTL, summarize=summarize,
+            cacheable=lambda key: key not in untranslated_keys)
+        map_span.set(segments=len(covered), chunks=chunk_count, reused=chunks_reused)
+    if not covered:
+        raise PipelineError({"error": "No transcript text in the requested time range"}, 400)
+    final, stats = reduce_summaries(summaries, failed, chunk_count, progress)
+    stats["chunks_reused"] = chunks_reused
+    stats["range"] = {
+        "start": covered[0][0],
+        "end": covered[-1][1],
+        "segments": len(covered),
+        "segment_seconds": YT_SEGMENT_SECONDS,
+    }
+    if compressions:
+        original = sum(c["original_chars"] for c in compressions)
+        kept = sum(c["compressed_chars"] for c in compressions)
+        stats["compression"] = {
+            "mode": "fast",
+            "original_chars": original,
+            "compressed_chars": kept,
+            "ratio": round(kept / original, 4) if original else 1.0,
+            "sentences": sum(c["sentences"] for c in compressions),
+            "sentences_kept": sum(c["sentences_kept"] for c in compressions),
+        }
+    if translate:
+        # reused chunks come from fully translated segments only
+        stats["translated_chunks"] = chunks_reused + sum(translated)
+        stats["untranslated_chunks"] = len(translated) - sum(translated)
+    return final, stats
+
+# ---------------- pipelines ----------------
+# Each pipeline returns the JSON-ready response dict and reports intermediate
+# results through `progress(event, data)`; expected failures raise PipelineError.
+
+def summarize_text_pipeline(text: str, mode: str = "", progress=no_progress):
+    text, compression = compress_for_mode(text, mode, progress)
+    with stage_timer("chunking"):
+        chunks = content_defined_chunks(text, max_chars=3000)
+    final, stats = map_reduce_summarize(chunks, progress)
+    response = {"summary": final, **stats}
+    if compression:
+        response["compression"] = compression
+    return response
+
+def summarize_pdf_pipeline(pdf_path: str, mode: str = "", progress=no_progress):
+    if fitz is None:
+        raise RuntimeError("PyMuPDF (fitz) is not installed. Install pymupdf to enable PDF summarization.")
+    page_keys = pdf_page_keys(pdf_path)
+    progress("pages", {"pages": len(page_keys)})
+    if mode == "fast":
+        # sentences are ranked against the whole document, so the text is gathered before chunking
+        pages = list(iter_pdf_page_texts(pdf_path, page_keys))
+        text = "\n".join(text for _, text, _ in pages).strip()
+        if not text:
+            raise PipelineError({"error": "PDF contains no extractable text"}, 400)
+        response = summarize_text_pipeline(text, mode, progress)
+        return {
+            "summary": response.pop("summary"),
+            "pages": len(page_keys),
+            "pages_reused": sum(1 for _, _, reused in pages if reused),
+            **response
+        }
+    counts = {"characters": 0, "pages_reused": 0}
+
+    def groups():
+        for group in iter_page_groups(iter_pdf_page_texts(pdf_path, page_keys)):
+            texts = [text for _, text, _ in group]
+            counts["characters"] += sum(len(t.strip()) for t in texts)
+            counts["pages_reused"] += sum(1 for _, _, reused in group if reused)
+            key = "summaries:" + cache_key(HF_SUMMARY_MODEL, [hashlib.sha256(t.encode("utf-8")).hexdigest() for t in texts])
+            with stage_timer("chunking"):
+                chunks = content_defined_chunks("\n".join(texts), max_chars=3000)
+            yield key, chunks
+
+    with span("map", source="pdf_pages") as map_span:
+        summaries, failed, chunk_count, chunks_reused = summarize_chunk_groups(groups(), progress, cache=pdf_cache, ttl=PDF_CACHE_TTL)
+        map_span.set(chunks=chunk_count, reused=chunks_reused)
+    if not counts["characters"]:
+        raise PipelineError({"error": "PDF contains no extractable text"}, 400)
+    final, stats = reduce_summaries(summaries, failed, chunk_count, progress)
+    return {
+        "summary": final,
+        "pages": len(page_keys),
+        "pages_reused": counts["pages_reused"],
+        "chunks_reused": chunks_reused,
+        **stats
+    }
+
+def summarize_youtube_pipeline(video_id: str, mood_analysis: bool = False, mode: str = "", progress=no_progress,
+                               start_time: float = None, end_time: float = None):
+    fetched = get_transcript(video_id)
+    index = fetched["transcript"]
+    transcript_language = fetched["language"]
+    tried_methods = fetched["tried"]
+
+    # the index buffer is already the space-joined text of every non-blank segment
+    transcript_text = index.text
     if not transcript_text:
-        return jsonify({"error": "Transcript empty after normalization"}), 404
+        raise PipelineError({"error": "Transcript empty after normalization"}, 404)
 
-    # If language unknown, try to infer (simple heuristic: if any non-ascii present -> not en)
+    # If language unknown, identify it offline from the transcript text
     src_lang = (transcript_language or "").lower()
+    detection = None
     if not src_lang:
-        # heuristic: check presence of common ascii words - this is not reliable; we prefer to use what's available
-        sample = transcript_text[:200].lower()
-        if re.search(r'[^\x00-\x7f]', sample):
+        with span("language_detect"):
+            detected, confidence = detect_language(transcript_text)
+        detection = {"language": detected, "confidence": confidence}
+        if detected and confidence >= LANGID_MIN_CONFIDENCE:
+            src_lang = detected
+        elif re.search(r'[^\x00-\x7f]', transcript_text[:200]):
             src_lang = "unknown_non_en"
         else:
             src_lang = "en"
 
     logger.info("Transcript language detected: %s (inferred/declared)", src_lang)
+    progress("transcript", {
+        "video_id": video_id,
+        "segments": len(index),
+        "characters": len(transcript_text),
+        "language": src_lang,
+        "cached": fetched["cached"],
+    })
 
-    # Always attempt translation to English, regardless of detected language
-    translated_text = None
-    translation_attempted = False
-    translation_src = None
-    try:
-        # Determine source language for translation model
-        if src_lang and src_lang != "unknown_non_en":
-            translation_src = src_lang.split("-")[0]
+    # Translate to English only when the source is known and not English
+    translation_src = src_lang.split("-")[0] if src_lang and src_lang != "unknown_non_en" else None
+    if translation_src and translation_src != "en":
+        logger.info("Attempting translation from detected language: %s", translation_src)
+    elif not translation_src:
+        logger.warning("Cannot determine source language for translation; falling back to original transcript.")
+
+    # Summarize (may be long; chunk and merge). Translation is pipelined into the map phase.
+    compression = None
+    if start_time is not None or end_time is not None:
+        final_summary, stats = summarize_transcript_range(index, start_time, end_time, translation_src, mode, progress)
+    else:
+        transcript_text, compression = compress_for_mode(transcript_text, mode, progress)
+        if translation_src and translation_src != "en":
+            final_summary, stats = translate_and_summarize(transcript_text, translation_src, progress)
         else:
-            # For unknown or non-English inferred, try to infer or use a default
-            # Since we always attempt, we'll try with the detected src_lang if available
-            translation_src = src_lang.split("-")[0] if src_lang else None
-
-        if translation_src:
-            logger.info("Attempting translation from detected language: %s", translation_src)
-            translated_text = call_hf_translate(transcript_text, translation_src)
-            translation_attempted = True
-            if translated_text:
-                logger.info("Translation succeeded (lang=%s).", translation_src)
-            else:
-                logger.warning("Translation returned None; will fall back to summarizing original transcript.")
+            with stage_timer("chunking"):
+                chunks = chunk_text(transcript_text, max_chars=3000, overlap=200)
+            logger.info("Summarizing %d chunks", len(chunks))
+            final_summary, stats = map_reduce_summarize(chunks, progress)
+
+    if translation_src == "en":
+        summary_language_note = "(original language: en)"
+    elif translation_src:
+        if stats["untranslated_chunks"] == 0:
+            summary_language_note = f"(translated from {src_lang})"
+        elif stats["translated_chunks"]:
+            summary_language_note = f"(partially translated from {src_lang}: {stats['translated_chunks']}/{stats['chunks']} chunks)"
         else:
-            logger.info("No source language detected; attempting translation with default model (may fail).")
-            # Try with a common non-English language or skip, but since we want to always attempt, perhaps try 'auto' or something
-            # For simplicity, if no src, we'll skip but mark as attempted
-            translation_attempted = True
-            logger.warning("Cannot determine source language for translation; falling back to original transcript.")
-    except Exception as e:
-        logger.warning("Translation attempt raised exception: %s", e)
-        translated_text = None
-        translation_attempted = True
-
-    # Decide final_text to summarize
-    if translated_text:
-        final_text = translated_text
-        summary_language_note = f"(translated from {src_lang})" if src_lang else "(translated)"
+            summary_language_note = f"(translation attempted but failed; original language: {src_lang})"
     else:
-        final_text = transcript_text
-        if translation_attempted:
-            summary_language_note = f"(translation attempted but failed; original language: {src_lang})" if src_lang else "(translation attempted but failed)"
-        else:
-            summary_language_note = f"(original language: {src_lang})" if src_lang else ""
+        summary_language_note = f"(translation attempted but failed; original language: {src_lang})" if src_lang else "(translation attempted but failed)"
+
+    response = {
+        "summary": final_summary,
+        "note": summary_language_note,
+        "transcript_language": src_lang or None,
+        "tried_transcript_methods": tried_methods,
+        "transcript_cached": fetched["cached"],
+        **stats
+    }
+    if detection:
+        response["language_detection"] = detection
+    if compression:
+        response["compression"] = compression
+
+    # Mood analysis if requested
+    if mood_analysis:
+        try:
+            logger.info("Performing mood analysis on transcript intervals")
+            time_chunks = chunk_transcript_by_time(index, interval_seconds=30, start_time=start_time, end_time=end_time)
+            with span("mood_analysis", intervals=len(time_chunks)):
+                mood_intervals = analyze_mood(time_chunks, progress)
+            response["mood_intervals"] = mood_intervals
+            logger.info("Mood analysis completed with %d intervals", len(mood_intervals))
+        except Exception as e:
+            logger.warning("Mood analysis failed: %s", e)
+            response["mood_intervals"] = []
+
+    return response
+
+# ---------------- streaming ----------------
+def stream_format():
+    """'ndjson' or 'sse' when the client asked for a streamed response, else None."""
+    fmt = (request.args.get("stream") or "").lower()
+    if fmt in ("sse", "ndjson"):
+        return fmt
+    if fmt in ("1", "true"):
+        return "ndjson"
+    if "text/event-stream" in (request.headers.get("Accept") or ""):
+        return "sse"
+    return None
+
+def format_event(fmt: str, event: str, data: dict):
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+def stream_pipeline(run, fmt: str, error_label: str):
+    """
+    Run `run(progress)` on a background thread and stream its progress events,
+    ending with a 'summary' event carrying the full response (or an 'error' event).
+    """
+    events = queue.Queue()
+
+    def progress(event, data):
+        events.put((event, data))
+
+    def worker():
+        try:
+            events.put(("summary", run(progress)))
+        except PipelineError as e:
+            events.put(("error", {**e.payload, "status": e.status}))
+        except Exception as e:
+            logger.exception("Error in streamed pipeline: %s", e)
+            events.put(("error", {"error": error_label, "detail": str(e), "status": 500}))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=in_context(worker), name="pipeline-stream", daemon=True).start()
+
+    def generate():
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield format_event(fmt, *item)
+
+    mimetype = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return Response(generate(), mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def respond_with_pipeline(run, error_label: str, log_label: str, key: str = None, cleanup=None):
+    """
+    Answer with run(progress)'s result as JSON, stream it when ?stream= is set,
+    or queue it as a job and return its ID at once when ?async=true.
+    Runs sharing `key` while one is in flight are coalesced into one.
+    `cleanup()` runs once this request's pipeline is finished, whichever mode.
+    """
+    current_route.set(log_label)
+    if key:
+        run = single_flight.wrap(key, run)
+    measured = run
+
+    def run(progress):
+        outcome = "error"
+        try:
+            with metrics.timer("aiext_request_seconds", (log_label,)):
+                result = measured(progress)
+            outcome = "ok"
+        except PipelineError:
+            outcome = "rejected"
+            raise
+        finally:
+            metrics.inc("aiext_requests_total", (log_label, outcome))
+        if isinstance(result, dict) and isinstance(result.get("chunks"), int):
+            metrics.observe("aiext_request_chunks", (log_label,), result["chunks"])
+        return result
+    if cleanup:
+        inner = run
+
+        def run(progress):
+            try:
+                return inner(progress)
+            finally:
+                cleanup()
+    mode = trace_mode()
+    if mode:
+        run = traced(run, mode, log_label)
+    if request.args.get("async", "false").lower() == "true":
+        try:
+            job = jobs.submit(log_label, run)
+        except PipelineError as e:
+            if cleanup:
+                cleanup()
+            return jsonify(e.payload), e.status
+        return jsonify({"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"}), 202
+    fmt = stream_format()
+    if fmt:
+        return stream_pipeline(run, fmt, error_label)
+    try:
+        return jsonify(run(no_progress))
+    except PipelineError as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        logger.exception("Error in %s: %s", log_label, e)
+        return jsonify({"error": error_label, "detail": str(e)}), 500
+
+# ---------------- single-flight ----------------
+class SingleFlight:
+    """
+    Coalesces identical in-flight pipeline runs. Within a process, later
+    callers wait on the first caller's result. Across gunicorn workers on the
+    same host, an flock on a lock file named after the key elects one leader
+    per key; the leader publishes its result to the shared sqlite cache and
+    workers that were waiting pick it up instead of running the pipeline
+    again. The leader removes the lock file when done, so files do not pile up.
+    """
+
+    def __init__(self, lock_dir: str, result_ttl: int = SINGLEFLIGHT_RESULT_TTL):
+        self.lock_dir = lock_dir
+        self.result_ttl = result_ttl
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._results = TieredCache("singleflight", max_items=0)
+        self.stats = {"leaders": 0, "followers": 0, "cross_process_followers": 0}
+
+    def wrap(self, key: str, run):
+        """Return a pipeline callable `run(progress)` coalesced on `key`; followers get no progress events."""
+        return lambda progress: self.do(key, lambda: run(progress))
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._inflight[key] = call
+                self.stats["leaders"] += 1
+            else:
+                self.stats["followers"] += 1
+        if not leader:
+            with span("single_flight_wait"):
+                call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = self._do_shared(key, fn)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call["event"].set()
+
+    def _lock_key(self, key: str):
+        """Open and flock the lock file for `key`; None if locking is unavailable."""
+        path = os.path.join(self.lock_dir, f"sf-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.lock")
+        while True:
+            try:
+                os.makedirs(self.lock_dir, exist_ok=True)
+                fh = open(path, "a+")
+            except OSError as e:
+                logger.warning("Single-flight lock unavailable: %s", e)
+                return None, path
+            with span("single_flight_lock"):
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                # a previous leader may have removed the file while we waited on it
+                if os.fstat(fh.fileno()).st_ino == os.stat(path).st_ino:
+                    return fh, path
+            except OSError:
+                pass
+            fh.close()
+
+    def _do_shared(self, key: str, fn):
+        if fcntl is None or not self.lock_dir:
+            return fn()
+        arrived = time.time()
+        fh, path = self._lock_key(key)
+        if fh is None:
+            return fn()
+        with fh:
+            try:
+                shared = self._results.get(key)
+                if shared is not None and shared["finished"] >= arrived:
+                    with self._lock:
+                        self.stats["cross_process_followers"] += 1
+                    return shared["result"]
+                result = fn()
+                if self.result_ttl > 0:
+                    self._results.set(key, {"finished": time.time(), "result": result}, ttl=self.result_ttl)
+                return result
+            finally:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+single_flight = SingleFlight(os.path.join(os.path.dirname(HF_CACHE_PATH), "locks") if HF_CACHE_PATH else None)
+
+# ---------------- jobs ----------------
+class JobStore:
+    """
+    Runs pipelines on a bounded per-process thread pool and tracks their state.
+    Records are mirrored to the shared sqlite cache so GET /jobs/<id> works on
+    any gunicorn worker, not just the one that accepted the job.
+    """
+
+    # minimum seconds between progress writes to disk
+    PERSIST_INTERVAL = 0.5
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT, ttl: int = JOB_RESULT_TTL):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._disk = TieredCache("jobs", max_items=0)
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def submit(self, kind: str, run):
+        """Queue `run(progress)`; returns the new job record. Raises PipelineError when the queue is full."""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            active = sum(1 for j in self._jobs.values() if j["status"] in ("queued", "running"))
+            if active >= self.queue_limit:
+                raise PipelineError({"error": "Job queue full, try again later"}, 503)
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "kind": kind,
+                "status": "queued",
+                "progress": {"stage": "queued", "chunks_done": 0, "chunks_total": None, "mood_intervals": 0, "items_done": 0},
+                "result": None,
+                "error": None,
+                "created": now,
+                "updated": now,
+            }
+            self._jobs[job["job_id"]] = job
+            self._persist(job)
+            self._executor().submit(in_context(self._run), job["job_id"], run)
+            return dict(job)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._disk.get(job_id)
+
+    def _update(self, job_id: str, force: bool = False, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            now = time.time()
+            if force or now - job["updated"] >= self.PERSIST_INTERVAL:
+                job["updated"] = now
+                self._persist(job)
+
+    def _persist(self, job):
+        self._disk.set(job["job_id"], job, ttl=self.ttl)
+
+    def _run(self, job_id: str, run):
+        self._update(job_id, force=True, status="running", progress={**self._jobs[job_id]["progress"], "stage": "running"})
+
+        def progress(event, data):
+            with self._lock:
+                current = dict(self._jobs[job_id]["progress"])
+            current["stage"] = event
+            if event == "chunk":
+                current["chunks_done"] += 1
+                current["chunks_total"] = data.get("total")
+            elif event == "mood":
+                current["mood_intervals"] += 1
+            elif event == "item":
+                current["items_done"] = current.get("items_done", 0) + 1
+            self._update(job_id, progress=current)
+
+        try:
+            result = run(progress)
+            self._update(job_id, force=True, status="done", result=result,
+                         progress={**self._jobs[job_id]["progress"], "stage": "done"})
+        except PipelineError as e:
+            self._update(job_id, force=True, status="failed", error={**e.payload, "status": e.status})
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job_id, e)
+            self._update(job_id, force=True, status="failed", error={"error": "Job failed", "detail": str(e), "status": 500})
+
+    def _prune(self, now: float):
+        expired = [k for k, j in self._jobs.items()
+                   if j["status"] in ("done", "failed") and now - j["updated"] > self.ttl]
+        for k in expired:
+            del self._jobs[k]
+
+jobs = JobStore()
 
-    # Summarize (may be long; chunk and merge)
+# ---------------- batch ----------------
+class FairShare:
+    """
+    Bounds the inference calls in flight across every batch item in this
+    process. When a slot frees up it goes to the waiting owner with the
+    fewest calls already in flight (earliest arrival on ties), so a large
+    item cannot starve the small ones queued behind it.
+    """
+
+    def __init__(self, limit: int = BATCH_HF_CONCURRENCY):
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._active = 0
+        self._in_flight = {}
+        self._waiting = []
+        self._tickets = 0
+
+    def _next(self):
+        return min(self._waiting, key=lambda w: (self._in_flight.get(w[1], 0), w[0]))
+
+    def acquire(self, owner: str):
+        with self._cond:
+            self._tickets += 1
+            waiter = (self._tickets, owner)
+            self._waiting.append(waiter)
+            while self._active >= self.limit or self._next() != waiter:
+                self._cond.wait()
+            self._waiting.remove(waiter)
+            self._active += 1
+            self._in_flight[owner] = self._in_flight.get(owner, 0) + 1
+            # another slot may still be free for the next waiter
+            self._cond.notify_all()
+
+    def release(self, owner: str):
+        with self._cond:
+            self._active -= 1
+            self._in_flight[owner] -= 1
+            if not self._in_flight[owner]:
+                del self._in_flight[owner]
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {"limit": self.limit, "active": self._active, "waiting": len(self._waiting), "owners": len(self._in_flight)}
+
+batch_share = FairShare()
+# (FairShare, owner) bound by a batch item; inherited by its pool threads through in_context
+current_share = contextvars.ContextVar("current_share", default=None)
+
+@contextmanager
+def inference_slot():
+    """Hold a slot of the bound fair share for one inference call; a no-op outside batch items."""
+    bound = current_share.get()
+    if bound is None:
+        yield
+        return
+    share, owner = bound
+    with span("fair_share_wait"):
+        share.acquire(owner)
     try:
-        chunks = chunk_text(final_text, max_chars=3000, overlap=200)
-        logger.info("Summarizing %d chunks", len(chunks))
-        chunk_summaries = [call_hf_summarize(c) for c in chunks]
-        if len(chunk_summaries) > 1:
-            final_summary = call_hf_summarize("\n".join(chunk_summaries))
+        yield
+    finally:
+        share.release(owner)
+
+def batch_item(raw, mode: str):
+    """
+    Validate one JSON batch entry: a video URL string, or an object with
+    'video_url' (plus optional 'mood', 'start', 'end') or 'text'.
+    Returns the runnable item, or one carrying 'error' and 'status'.
+    """
+    if isinstance(raw, str):
+        raw = {"video_url": raw}
+    if not isinstance(raw, dict):
+        return {"type": None, "error": {"error": "Batch items must be a URL string or an object"}, "status": 400}
+    if raw.get("video_url"):
+        video_id = extract_video_id(raw["video_url"])
+        if not video_id:
+            return {"type": "youtube", "error": {"error": "Invalid YouTube URL / could not extract ID"}, "status": 400}
+        try:
+            start_time, end_time = parse_timestamp(raw.get("start")), parse_timestamp(raw.get("end"))
+        except ValueError as e:
+            return {"type": "youtube", "error": {"error": "Invalid start/end time", "detail": str(e)}, "status": 400}
+        if start_time is not None and end_time is not None and end_time <= start_time:
+            return {"type": "youtube", "error": {"error": "end must be after start"}, "status": 400}
+        mood = str(raw.get("mood", False)).lower() == "true"
+        return {"type": "youtube", "key": cache_key("youtube", video_id, mood, mode, start_time, end_time),
+                "run": lambda: summarize_youtube_pipeline(video_id, mood, mode, no_progress, start_time, end_time)}
+    text = (raw.get("text") or "").strip() if isinstance(raw.get("text"), str) else ""
+    if text:
+        return {"type": "text", "key": cache_key("text", text, mode),
+                "run": lambda: summarize_text_pipeline(text, mode)}
+    return {"type": raw.get("type"), "error": {"error": "Batch item needs a 'video_url' or 'text'"}, "status": 400}
+
+def summarize_batch_pipeline(items, progress=no_progress):
+    """
+    Summarize prepared batch items. Items with the same key run once and
+    every duplicate gets that result. Up to BATCH_ITEM_CONCURRENCY items run
+    at a time, each coalesced with identical single requests through
+    single-flight, and their inference calls share batch_share fairly.
+    Emits an 'item' event per input as its result lands; one failing item
+    never fails the batch.
+    """
+    results = [None] * len(items)
+    groups = OrderedDict()
+    for i, item in enumerate(items):
+        if "error" in item:
+            results[i] = {"index": i, "type": item["type"], "status": item["status"], "error": item["error"]}
+            progress("item", results[i])
         else:
-            final_summary = chunk_summaries[0]
+            groups.setdefault(item["key"], []).append(i)
+    keys = list(groups)
 
-        response = {
-            "summary": final_summary,
-            "note": summary_language_note,
-            "transcript_language": src_lang or None,
-            "tried_transcript_methods": tried_methods
-        }
+    def run(key):
+        token = current_share.set((batch_share, key))
+        try:
+            with span("batch_item", type=items[groups[key][0]]["type"]):
+                return single_flight.do(key, items[groups[key][0]]["run"])
+        finally:
+            current_share.reset(token)
+
+    def on_item(k, ok, value):
+        if ok:
+            outcome = {"status": 200, "result": value}
+        elif isinstance(value, PipelineError):
+            outcome = {"status": value.status, "error": value.payload}
+        else:
+            logger.warning("Batch item failed: %s", value)
+            outcome = {"status": 500, "error": {"error": "Summarization failed", "detail": str(value)}}
+        for i in groups[keys[k]]:
+            results[i] = {"index": i, "type": items[i]["type"], **outcome}
+            progress("item", results[i])
+
+    started = time.time()
+    parallel_map(run, keys, max_workers=BATCH_ITEM_CONCURRENCY, on_result=on_item)
+    return {
+        "items": results,
+        "total": len(items),
+        "unique": len(keys),
+        "succeeded": sum(1 for r in results if r["status"] == 200),
+        "failed": sum(1 for r in results if r["status"] != 200),
+        "seconds": round(time.time() - started, 3),
+    }
+
+# ---------------- model warm-up ----------------
+class ModelWarmer:
+    """
+    Keeps router-hosted models loaded. Real calls record per-model usage and
+    warm/loading state in the shared sqlite cache; one worker per host (an
+    flock elects it) runs a scheduler thread that pings the configured models
+    at boot and then every WARMUP_INTERVAL, plus any translation model used
+    within WARMUP_RECENT_SECONDS, most recently used first. Pings bypass the
+    inference cache and do not count as usage.
+    """
+    PING_INPUT = "Hello, this is a short warm-up request."
+    PING_PARAMS = {"summarization": {"max_length": 8, "min_length": 1}}
+    FLUSH_SECONDS = 30
+
+    def __init__(self, lock_dir: str, interval: int = WARMUP_INTERVAL, tick: int = WARMUP_TICK):
+        self.lock_dir = lock_dir
+        self.interval = interval
+        self.tick = tick
+        self._store = TieredCache("models", max_items=0)
+        self._usage = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._leader = None
+
+    def configured(self):
+        models = [HF_SUMMARY_MODEL, HF_SENTIMENT_MODEL, HF_MULTI_TRANSLATION_MODEL] + WARMUP_MODELS
+        return [m for i, m in enumerate(models) if m not in models[:i] and self._hosted(m)]
 
-        # Mood analysis if requested
-        if mood_analysis:
+    def tracked(self):
+        """Every model the scheduler may keep hot: configured ones and each opus-mt source model."""
+        models = self.configured()
+        for src in sorted(OPUS_MT_SOURCES):
+            model = translation_model_for(src)
+            if model not in models and self._hosted(model):
+                models.append(model)
+        return models
+
+    @staticmethod
+    def _hosted(model: str):
+        return INFERENCE_BACKENDS.get(task_for(model), INFERENCE_BACKEND) == "hf"
+
+    def _merge(self, model: str, uses: int = 0, **fields):
+        entry = self._store.get(model) or {}
+        entry.update({k: v for k, v in fields.items() if v is not None})
+        entry["uses"] = entry.get("uses", 0) + uses
+        self._store.set(model, entry)
+
+    def record(self, model: str, status):
+        """Note a real inference call; flushed to the shared store at most every FLUSH_SECONDS per model."""
+        if not self._hosted(model):
+            return
+        now = time.time()
+        state = "warm" if status == 200 else "loading" if status == 503 else None
+        with self._lock:
+            usage = self._usage.setdefault(model, {"uses": 0, "flushed": 0.0})
+            usage["uses"] += 1
+            usage["state"] = state or usage.get("state")
+            if now - usage["flushed"] < self.FLUSH_SECONDS:
+                return
+            uses, state = usage["uses"], usage.pop("state", None)
+            usage.update(uses=0, flushed=now)
+        self._merge(model, uses=uses, last_used=now, state=state, checked=now if state else None)
+
+    def ping(self, model: str):
+        started = time.time()
+        entry = {"checked": started, "retry_at": None}
+        try:
+            status, data = get_hf_client().post(model, self.PING_INPUT,
+                                                parameters=self.PING_PARAMS.get(task_for(model)), retries=0)
+        except CircuitOpenError:
+            status, data = None, None
+            entry["state"] = "unavailable"
+        except Exception as e:
+            status, data = None, str(e)
+            entry["state"] = "error"
+        else:
+            entry["latency_ms"] = round((time.time() - started) * 1000)
+            if status == 200:
+                entry["state"] = "warm"
+            elif status == 503:
+                entry["state"] = "loading"
+                estimated = data.get("estimated_time") if isinstance(data, dict) else None
+                entry["retry_at"] = started + float(estimated or self.tick)
+            else:
+                entry["state"] = "error"
+        if entry["state"] != "warm":
+            logger.info("Warm-up ping for %s: %s (%s)", model, entry["state"], status or str(data)[:100])
+        entry = {**(self._store.get(model) or {}), **entry}
+        self._store.set(model, entry)
+        return entry["state"]
+
+    def due(self, now: float = None):
+        """Models that need a ping now, most recently used first."""
+        now = now or time.time()
+        configured = set(self.configured())
+        due = []
+        for model in self.tracked():
+            entry = self._store.get(model) or {}
+            last_used = entry.get("last_used", 0)
+            if model not in configured and now - last_used > WARMUP_RECENT_SECONDS:
+                continue
+            if entry.get("state") == "loading":
+                if now < (entry.get("retry_at") or 0):
+                    continue
+            elif entry and now - max(last_used, entry.get("checked", 0)) < self.interval:
+                continue
+            due.append((-last_used, -entry.get("uses", 0), model))
+        return [model for _, _, model in sorted(due)]
+
+    def _is_leader(self):
+        if self._leader is not None:
+            return True
+        if fcntl is None or not self.lock_dir:
+            self._leader = True
+            return True
+        try:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            fh = open(os.path.join(self.lock_dir, "warmer.lock"), "a+")
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        # held for the life of the process; the OS releases it if the worker dies
+        self._leader = fh
+        logger.info("Model warm-up scheduler running in pid %d", os.getpid())
+        return True
+
+    def _run(self):
+        wait = 0
+        while True:
+            time.sleep(wait)
+            wait = self.tick
             try:
-                logger.info("Performing mood analysis on transcript intervals")
-                time_chunks = chunk_transcript_by_time(transcript_list, interval_seconds=30)
-                mood_intervals = []
-                for chunk in time_chunks:
-                    text = chunk.get('text', '').strip()
-                    if text:
-                        sentiment = call_hf_sentiment(text)
-                        if sentiment:
-                            mood_intervals.append({
-                                'start': chunk['start'],
-                                'end': chunk['end'],
-                                'mood': sentiment.get('label', 'UNKNOWN'),
-                                'score': sentiment.get('score', 0.0)
-                            })
-                        else:
-                            mood_intervals.append({
-                                'start': chunk['start'],
-                                'end': chunk['end'],
-                                'mood': 'UNKNOWN',
-                                'score': 0.0
-                            })
-                response["mood_intervals"] = mood_intervals
-                logger.info("Mood analysis completed with %d intervals", len(mood_intervals))
+                if self._is_leader():
+                    for model in self.due()[:WARMUP_MAX_PER_TICK]:
+                        self.ping(model)
             except Exception as e:
-                logger.warning("Mood analysis failed: %s", e)
-                response["mood_intervals"] = []
+                logger.warning("Model warm-up tick failed: %s", e)
 
-        return jsonify(response)
-    except Exception as e:
-        logger.exception("Error during summarization: %s", e)
-        return jsonify({"error": "Summarization failed", "detail": str(e)}), 500
+    def start(self):
+        """Start the scheduler thread once per process (again after a fork)."""
+        if not self.interval or not HF_API_KEY or not self.configured():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._leader = None
+        threading.Thread(target=self._run, name="model-warmer", daemon=True).start()
+
+    def status(self):
+        now = time.time()
+        configured = set(self.configured())
+        circuits = get_hf_client().breaker.snapshot() if HF_API_KEY else {}
+        models = []
+        for model in self.tracked():
+            entry = self._store.get(model) or {}
+            if model not in configured and not entry:
+                continue
+            kept_hot = model in configured or now - entry.get("last_used", 0) <= WARMUP_RECENT_SECONDS
+            models.append({
+                "model": model,
+                "task": task_for(model),
+                "state": entry.get("state", "cold"),
+                "configured": model in configured,
+                "kept_hot": kept_hot,
+                "uses": entry.get("uses", 0),
+                "last_used": entry.get("last_used"),
+                "last_checked": entry.get("checked"),
+                "latency_ms": entry.get("latency_ms"),
+                "circuit": circuits.get(model),
+            })
+        return {
+            "interval": self.interval,
+            "scheduler_running": self._pid == os.getpid(),
+            "scheduler_leader": bool(self._leader),
+            "models": models,
+        }
+
+model_warmer = ModelWarmer(os.path.join(os.path.dirname(HF_CACHE_PATH), "locks") if HF_CACHE_PATH else None)
+
+# ---------------- Routes ----------------
+
+@app.route("/")
+def home():
+    return jsonify({"message": "API is running"})
+
+@app.route("/favicon.ico")
+def favicon():
+    return send_from_directory("static", "favicon.ico")
+
+@app.route("/cache/stats")
+def cache_stats():
+    # counters are per worker process; the disk tier is shared
+    return jsonify({
+        "pid": os.getpid(),
+        "inference": inference_cache.snapshot(),
+        "transcripts": transcript_cache.snapshot(),
+        "pdf": pdf_cache.snapshot(),
+        "segments": segment_cache.snapshot(),
+        "singleflight": dict(single_flight.stats),
+        "batch_share": batch_share.snapshot(),
+    })
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/models/status")
+def models_status():
+    return jsonify(model_warmer.status())
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({"error": "Upload too large", "max_mb": PDF_MAX_UPLOAD_MB}), 413
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+def summary_mode():
+    """The ?mode= option shared by the summarize routes; None if unrecognized."""
+    mode = request.args.get("mode", "").lower()
+    return mode if mode in SUMMARY_MODES else None
+
+def mode_error(mode):
+    """Error response for a mode this server cannot run, else None."""
+    if mode is None:
+        return jsonify({"error": "Unknown mode"}), 400
+    if mode == "fast" and np is None:
+        return jsonify({"error": "mode=fast is unavailable: NumPy is not installed on this server"}), 501
+    return None
+
+def parse_timestamp(value):
+    """
+    Seconds from a number or an 'h:mm:ss' / 'mm:ss' / 'ss' string; None when absent.
+    Raises ValueError for anything else, including negative times.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"invalid time: {value!r}")
+    parts = str(value).strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(f"invalid time: {value!r}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    if seconds < 0 or not math.isfinite(seconds):
+        raise ValueError(f"invalid time: {value!r}")
+    return seconds
+
+@app.route("/summarize/text", methods=["POST"])
+def summarize_text():
+    data = request.json or {}
+    text = (data.get("text") or "").strip()
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    mode = summary_mode()
+    error = mode_error(mode)
+    if error:
+        return error
+    return respond_with_pipeline(lambda progress: summarize_text_pipeline(text, mode, progress),
+                                 "Summarization failed", "summarize_text", key=cache_key("text", text, mode))
+
+@app.route("/summarize/pdf", methods=["POST"])
+def summarize_pdf():
+    if "file" not in request.files:
+        return jsonify({"error": "No file part"}), 400
+    f = request.files["file"]
+    if f.filename == "":
+        return jsonify({"error": "No file selected"}), 400
+    mode = summary_mode()
+    error = mode_error(mode)
+    if error:
+        return error
+    # spool to disk now: the upload is gone once a streamed or async response outlives the request
+    pdf_path, digest, size = spool_upload(f)
+    logger.info("Spooled PDF upload (%d bytes)", size)
+    metrics.inc("aiext_upload_bytes_total", ("summarize_pdf",), size)
+    return respond_with_pipeline(lambda progress: summarize_pdf_pipeline(pdf_path, mode, progress),
+                                 "PDF summarization failed", "summarize_pdf",
+                                 key=cache_key("pdf", digest, mode), cleanup=lambda: remove_quietly(pdf_path))
+
+@app.route("/summarize/youtube", methods=["POST"])
+def summarize_youtube():
+    data = request.json or {}
+    video_url = data.get("video_url")
+    if not video_url:
+        return jsonify({"error": "No video URL provided"}), 400
+    mood_analysis = request.args.get("mood", "false").lower() == "true"
+    mode = summary_mode()
+    error = mode_error(mode)
+    if error:
+        return error
+
+    try:
+        # optional time range, in the JSON body or the query string
+        start_time = parse_timestamp(data.get("start", request.args.get("start")))
+        end_time = parse_timestamp(data.get("end", request.args.get("end")))
+    except ValueError as e:
+        return jsonify({"error": "Invalid start/end time", "detail": str(e)}), 400
+    if start_time is not None and end_time is not None and end_time <= start_time:
+        return jsonify({"error": "end must be after start"}), 400
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        return jsonify({"error": "Invalid YouTube URL / could not extract ID"}), 400
+
+    return respond_with_pipeline(lambda progress: summarize_youtube_pipeline(video_id, mood_analysis, mode, progress,
+                                                                             start_time, end_time),
+                                 "Summarization failed", "summarize_youtube",
+                                 key=cache_key("youtube", video_id, mood_analysis, mode, start_time, end_time))
+
+@app.route("/summarize/batch", methods=["POST"])
+def summarize_batch():
+    # JSON {"items": [...]} of video URLs and texts, or multipart with the same list
+    # as a JSON 'items' field plus PDFs under 'files'
+    mode = summary_mode()
+    error = mode_error(mode)
+    if error:
+        return error
+    if request.files:
+        try:
+            raw_items = json.loads(request.form.get("items") or "[]")
+        except ValueError:
+            return jsonify({"error": "'items' must be a JSON list"}), 400
+        uploads = [f for f in request.files.getlist("files") + request.files.getlist("file") if f.filename]
+    else:
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({"error": "Request body must be a JSON object with an 'items' list"}), 400
+        raw_items = body.get("items") or []
+        uploads = []
+    if not isinstance(raw_items, list):
+        return jsonify({"error": "'items' must be a JSON list"}), 400
+    if not raw_items and not uploads:
+        return jsonify({"error": "No items provided"}), 400
+    if len(raw_items) + len(uploads) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+
+    items = [batch_item(raw, mode) for raw in raw_items]
+    spooled = []
+    for f in uploads:
+        pdf_path, digest, size = spool_upload(f)
+        spooled.append(pdf_path)
+        metrics.inc("aiext_upload_bytes_total", ("summarize_batch",), size)
+        items.append({"type": "pdf", "key": cache_key("pdf", digest, mode),
+                      "run": lambda pdf_path=pdf_path: summarize_pdf_pipeline(pdf_path, mode)})
+    logger.info("Batch of %d items (%d PDFs)", len(items), len(spooled))
+
+    def cleanup():
+        for path in spooled:
+            remove_quietly(path)
+
+    return respond_with_pipeline(lambda progress: summarize_batch_pipeline(items, progress),
+                                 "Batch summarization failed", "summarize_batch", cleanup=cleanup)
 
 @app.route("/summarize/youtube-debug", methods=["POST"])
 def summarize_youtube_debug():
@@ -722,6 +3570,7 @@ def summarize_youtube_debug():
         return jsonify({"error": "No video URL provided"}), 400
     vid = extract_video_id(video_url) or "UNKNOWN"
     info = {"video_id": vid, "python_executable": sys.executable, "python_version": sys.version}
+    info["transcript_provider"] = transcript_provider.describe()
     try:
         yt_mod = importlib.import_module("youtube_transcript_api")
         info["yt_module_file"] = getattr(yt_mod, "__file__", None)
@@ -758,6 +3607,16 @@ def summarize_youtube_debug():
         info["pkg_resources_available"] = False
     return jsonify({"debug": info})
 
+@app.before_request
+def ensure_background_services():
+    # gunicorn forks workers after import; threads started before the fork do not survive it
+    model_warmer.start()
+    metrics.start()
+
+# start at boot so idle workers keep models warm; safe since PDF extraction children import only pdf_extract
+model_warmer.start()
+metrics.start()
+
 # ---------------- run ----------------
 if __name__ == "__main__":
     # development server
@@ -0,0 +1,381 @@
+"""
+Load benchmark for the summarize routes, fully offline.
+
+Starts a fake Hugging Face inference router (configurable latency, error
+rate, 503 "loading" cold starts, list-input batching) and a fake
+youtube_transcript_api, then serves app.py on a local port and drives
+/summarize/text, /summarize/pdf and /summarize/youtube with generated
+corpora: long articles, multi-hundred-page PDFs and hour-long transcripts
+in many languages.
+
+Run from the Backend folder:
+    python benchmark.py --requests 20 --concurrency 4
+    python benchmark.py --endpoints youtube --mood --json after.json --compare before.json
+
+Reports p50/p95/p99 latency, requests per second, router calls per request,
+RSS growth during each endpoint's phase and peak RSS of the PDF extraction
+processes. Every request gets distinct input unless
+--repeat-inputs is set, so the inference and page caches start cold.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from build_langid_model import SAMPLES
+
+# non-Latin scripts are identified by Unicode range in app.py, so they have no trigram samples there
+EXTRA_SAMPLES = {
+    "ru": "Всем привет и добро пожаловать на канал. Сегодня мы поговорим о том, как мозг учится новому. "
+          "Сон очень важен для памяти, и это подтверждают многие исследования. Не забудьте подписаться.",
+    "hi": "सभी को नमस्कार और चैनल पर आपका स्वागत है। आज हम बात करेंगे कि दिमाग नई चीजें कैसे सीखता है। "
+          "नींद याददाश्त के लिए बहुत जरूरी है। चैनल को सब्सक्राइब करना न भूलें।",
+    "ja": "皆さんこんにちは、チャンネルへようこそ。今日は脳が新しいことをどのように学ぶかについて話します。"
+          "睡眠は記憶にとってとても大切です。チャンネル登録をお忘れなく。",
+}
+CORPORA = {lang: text for lang, text in {**SAMPLES, **EXTRA_SAMPLES}.items()}
+_SENTENCES = {
+    lang: [s.strip() for s in re.split(r"(?<=[.!?。।])\s*", " ".join(text.split())) if len(s.strip()) > 3]
+    for lang, text in CORPORA.items()
+}
+
+
+def make_text(lang: str, chars: int, seed: int):
+    """Shuffled sentences of `lang` up to `chars`, tagged with the seed so every request is distinct."""
+    rng = random.Random(seed)
+    sentences = _SENTENCES[lang]
+    out, size = [f"Document {seed}."], 0
+    while size < chars:
+        s = rng.choice(sentences)
+        out.append(s)
+        size += len(s) + 1
+    return " ".join(out)
+
+
+# ---------------- fake inference router ----------------
+class FakeRouter:
+    """
+    Stand-in for router.huggingface.co. Latency is base + per-1k-characters of
+    input; a list input is one batched call. A model answers 503 with an
+    estimated_time for `cold_start` seconds after its first request.
+    """
+
+    def __init__(self, latency_ms: float, ms_per_kchar: float, error_rate: float, cold_start: float, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.ms_per_kchar = ms_per_kchar
+        self.error_rate = error_rate
+        self.cold_start = cold_start
+        self.rng = random.Random(seed)
+        self.loaded_at = {}
+        self.calls = 0
+        self.statuses = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def respond(self, model: str, inputs):
+        items = inputs if isinstance(inputs, list) else [inputs]
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            loaded_at = self.loaded_at.setdefault(model, now + self.cold_start)
+            failed = self.rng.random() < self.error_rate
+        if now < loaded_at:
+            return 503, {"error": f"Model {model} is currently loading", "estimated_time": round(loaded_at - now, 1)}
+        time.sleep((self.latency_ms + self.ms_per_kchar * sum(len(str(x)) for x in items) / 1000) / 1000)
+        if failed:
+            return 500, {"error": "Internal error (injected)"}
+        if "sentiment" in model:
+            out = [[{"label": "positive", "score": 0.7}, {"label": "neutral", "score": 0.2},
+                    {"label": "negative", "score": 0.1}] for _ in items]
+        elif "opus-mt" in model:
+            out = [{"translation_text": make_text("en", max(40, len(str(x)) // 2), len(str(x)))} for x in items]
+        else:
+            out = [{"summary_text": " ".join(str(x).split()[:40])} for x in items]
+        return 200, out if isinstance(inputs, list) else out[:1] if "sentiment" not in model else out
+
+    def start(self):
+        router = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                status, data = router.respond(self.path.split("/models/", 1)[-1], body.get("inputs", ""))
+                with router.lock:
+                    router.statuses[status] = router.statuses.get(status, 0) + 1
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="fake-router", daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}/models"
+
+
+# ---------------- fake transcript provider ----------------
+def install_fake_transcripts():
+    """
+    Register a youtube_transcript_api stand-in. Video IDs read
+    '<lang>-<minutes>-<n>'; the transcript has a two-second segment per
+    sentence in that language for that many minutes.
+    """
+    class YouTubeTranscriptApi:
+        @classmethod
+        def get_transcript(cls, video_id, languages=("en",)):
+            lang, minutes, n = video_id.split("-")
+            rng = random.Random(f"{video_id}")
+            sentences = _SENTENCES[lang]
+            segments = [{"start": 0.0, "duration": 2.0, "text": f"Video {n}."}]
+            for i in range(1, int(minutes) * 30):
+                segments.append({"start": i * 2.0, "duration": 2.0, "text": rng.choice(sentences)})
+            return segments
+
+    module = types.ModuleType("youtube_transcript_api")
+    module.YouTubeTranscriptApi = YouTubeTranscriptApi
+    sys.modules["youtube_transcript_api"] = module
+
+
+def make_pdf(path: str, pages: int, seed: int):
+    import fitz
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        text = make_text("en", 1800, seed * 100000 + p)
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+# ---------------- measurement ----------------
+class MemorySampler:
+    """
+    Memory used by one phase, sampled from /proc (Linux only; zeros elsewhere).
+    `growth` is this process's peak RSS minus its RSS when the phase began, so
+    it excludes what earlier phases left behind; the fake router and client
+    live here too but stay small. `children` is the peak combined RSS of
+    child processes (the PDF extraction pool), which process RSS never sees.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start = self.peak = self.children = 0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def rss(pid="self"):
+        try:
+            with open(f"/proc/{pid}/statm") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return 0
+
+    def _sample(self):
+        self.peak = max(self.peak, self.rss())
+        self.children = max(self.children, sum(self.rss(p.pid) for p in multiprocessing.active_children()))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    @property
+    def growth(self):
+        return max(0, self.peak - self.start)
+
+    def __enter__(self):
+        self.start = self.peak = self.rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def run_phase(name: str, send, count: int, concurrency: int, router: FakeRouter):
+    latencies, errors = [], 0
+    calls_before = router.calls
+    with MemorySampler() as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            def one(i):
+                t0 = time.perf_counter()
+                ok = send(i)
+                return ok, time.perf_counter() - t0
+            for ok, elapsed in pool.map(one, range(count)):
+                latencies.append(elapsed)
+                errors += 0 if ok else 1
+        wall = time.perf_counter() - started
+    ms = [x * 1000 for x in latencies]
+    return {
+        "endpoint": name,
+        "requests": count,
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "rps": round(count / wall, 2),
+        "router_calls_per_request": round((router.calls - calls_before) / count, 2),
+        "rss_growth_mb": round(memory.growth / 2 ** 20, 1),
+        "children_rss_mb": round(memory.children / 2 ** 20, 1),
+    }
+
+
+def print_table(results, baseline=None):
+    cols = ["endpoint", "requests", "errors", "p50_ms", "p95_ms", "p99_ms", "rps", "router_calls_per_request",
+            "rss_growth_mb", "children_rss_mb"]
+    before = {r["endpoint"]: r for r in (baseline or {}).get("results", [])}
+    print("  ".join(f"{c:>12}" for c in cols))
+    for r in results:
+        print("  ".join(f"{str(r[c]):>12}" for c in cols))
+        old = before.get(r["endpoint"])
+        if old:
+            deltas = []
+            for c in cols[3:]:
+                if old.get(c) and c in r:
+                    deltas.append(f"{(r[c] - old[c]) / old[c] * 100:+.0f}%")
+                else:
+                    deltas.append("-")
+            print("  ".join(f"{'':>12}" for _ in cols[:3]) + "  " + "  ".join(f"{d:>12}" for d in deltas))
+
+
+def run_benchmark(args, router: FakeRouter, workdir: str):
+    """Serve the app against `router`, run every selected endpoint phase and return their results."""
+    # app.py reads its configuration at import time
+    os.environ.update({
+        "HF_API_KEY": "benchmark",
+        "HF_BASE_URL": router.start(),
+        "HF_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "WARMUP_INTERVAL": "0",
+        "HF_RATE_LIMIT": args.hf_rate_limit,
+    })
+    install_fake_transcripts()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as backend
+    from werkzeug.serving import make_server
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="app-server", daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    query = f"?mode={args.mode}" if args.mode else ""
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    def seed(i):
+        return 0 if args.repeat_inputs else i
+
+    def post(path, **kwargs):
+        try:
+            r = session.post(base + path, timeout=600, **kwargs)
+            return r.status_code == 200
+        except requests.RequestException:
+            return False
+
+    results = []
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    if "text" in endpoints:
+        texts = [make_text("en", args.text_chars, seed(i)) for i in range(args.requests)]
+        results.append(run_phase("text", lambda i: post("/summarize/text" + query, json={"text": texts[i]}),
+                                 args.requests, args.concurrency, router))
+    if "pdf" in endpoints:
+        if backend.fitz is None:
+            print("skipping pdf: PyMuPDF is not installed")
+        else:
+            paths = {}
+            for i in range(args.requests):
+                s = seed(i)
+                if s not in paths:
+                    paths[s] = os.path.join(workdir, f"doc-{s}.pdf")
+                    make_pdf(paths[s], args.pdf_pages, s)
+
+            def send_pdf(i):
+                with open(paths[seed(i)], "rb") as fh:
+                    return post("/summarize/pdf" + query, files={"file": ("doc.pdf", fh, "application/pdf")})
+            results.append(run_phase("pdf", send_pdf, args.requests, args.concurrency, router))
+    if "youtube" in endpoints:
+        languages = [lang for lang in args.languages.split(",") if lang in _SENTENCES]
+        params = "&".join(p for p in [query.lstrip("?"), "mood=true" if args.mood else ""] if p)
+
+        def send_video(i):
+            video_id = f"{languages[i % len(languages)]}-{args.transcript_minutes}-{seed(i)}"
+            return post("/summarize/youtube" + (f"?{params}" if params else ""),
+                        json={"video_url": f"https://www.youtube.com/watch?v={video_id}"})
+        results.append(run_phase("youtube", send_video, args.requests, args.concurrency, router))
+
+    server.shutdown()
+    backend.reset_pdf_pool()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", default="text,pdf,youtube")
+    parser.add_argument("--requests", type=int, default=12, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--text-chars", type=int, default=60000)
+    parser.add_argument("--pdf-pages", type=int, default=300)
+    parser.add_argument("--transcript-minutes", type=int, default=60)
+    parser.add_argument("--languages", default=",".join(CORPORA), help="transcript languages, cycled across requests")
+    parser.add_argument("--mood", action="store_true", help="request mood analysis on /summarize/youtube")
+    parser.add_argument("--mode", default="", help="summarize mode query parameter (e.g. fast)")
+    parser.add_argument("--repeat-inputs", action="store_true", help="send the same input every time (warm caches)")
+    parser.add_argument("--hf-latency-ms", type=float, default=80)
+    parser.add_argument("--hf-ms-per-kchar", type=float, default=15)
+    parser.add_argument("--hf-error-rate", type=float, default=0.0)
+    parser.add_argument("--hf-cold-start", type=float, default=0.0, help="seconds each model answers 503 loading")
+    parser.add_argument("--hf-rate-limit", default="0", help="app HF_RATE_LIMIT; 0 disables the client-side limiter")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to diff against")
+    args = parser.parse_args()
+
+    router = FakeRouter(args.hf_latency_ms, args.hf_ms_per_kchar, args.hf_error_rate, args.hf_cold_start)
+    workdir = tempfile.mkdtemp(prefix="summarizer-bench-")
+    try:
+        results = run_benchmark(args, router, workdir)
+    finally:
+        # generated PDFs plus the app's sqlite cache, locks and metrics files
+        shutil.rmtree(workdir, ignore_errors=True)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print_table(results, baseline)
+    print(f"router responses by status: {dict(sorted(router.statuses.items()))}")
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k not in ("json", "compare")}
+        with open(args.json, "w") as fh:
+            json.dump({"created": time.time(), "config": config, "results": results}, fh, indent=1)
+        print("wrote", args.json)
+
+if __name__ == "__main__":
+    main()
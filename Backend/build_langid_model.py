@@ -0,0 +1,220 @@
+"""
+Builds langid_model.json, the character trigram profiles used by app.detect_language.
+
+Run from the Backend folder after editing SAMPLES:
+    python build_langid_model.py
+
+Only Latin-script languages need trigram profiles; other scripts are
+identified from their Unicode ranges in app.py.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+
+TOP_N = 400
+
+SAMPLES = {
+    "en": """
+        Hello everyone and welcome back to the channel. Today we are going to talk about how the
+        brain learns new things and why sleep is so important for memory. If you have ever wondered
+        what happens when you study late at night, this video is for you. So let's get started with
+        the first question: what actually is a memory? When you learn something, the connections
+        between your neurons change, and those changes need time to become stable. That is why
+        people who sleep well usually remember more of what they studied the day before. Make sure
+        you subscribe and leave a comment below if you have any questions about this topic. The
+        results of the study were surprising, and they should make us think about the way we work.
+        I think that this is one of the most interesting things that I have read this year.
+        Now here is the part where most people get it wrong. The number one mistake is trying to
+        do everything at once, which just makes you tired. Instead, pick one small thing, write it
+        down, and come back to it every morning. You would be surprised how much you can get done
+        in a week. Right, so let me show you an example on the screen. This sentence here is what
+        we want, and that one over there is what we should avoid. Okay, any questions so far?
+        Thanks for watching, and I will see you in the next one.
+    """,
+    "es": """
+        Hola a todos y bienvenidos de nuevo al canal. Hoy vamos a hablar de cómo aprende el cerebro
+        cosas nuevas y por qué el sueño es tan importante para la memoria. Si alguna vez te has
+        preguntado qué pasa cuando estudias hasta tarde por la noche, este vídeo es para ti. Así que
+        empecemos con la primera pregunta: ¿qué es realmente un recuerdo? Cuando aprendes algo, las
+        conexiones entre tus neuronas cambian, y esos cambios necesitan tiempo para volverse estables.
+        Por eso las personas que duermen bien suelen recordar más de lo que estudiaron el día
+        anterior. No olvides suscribirte y dejar un comentario si tienes alguna pregunta sobre este
+        tema. Los resultados del estudio fueron sorprendentes y deberían hacernos pensar en la forma
+        en que trabajamos. Creo que es una de las cosas más interesantes que he leído este año.
+    """,
+    "fr": """
+        Bonjour à tous et bienvenue sur la chaîne. Aujourd'hui, nous allons parler de la façon dont le
+        cerveau apprend de nouvelles choses et de la raison pour laquelle le sommeil est si important
+        pour la mémoire. Si vous vous êtes déjà demandé ce qui se passe quand vous étudiez tard le soir,
+        cette vidéo est faite pour vous. Alors commençons par la première question : qu'est-ce qu'un
+        souvenir ? Quand vous apprenez quelque chose, les connexions entre vos neurones changent, et ces
+        changements ont besoin de temps pour devenir stables. C'est pourquoi les gens qui dorment bien
+        se souviennent généralement mieux de ce qu'ils ont étudié la veille. N'oubliez pas de vous
+        abonner et de laisser un commentaire si vous avez des questions sur ce sujet. Les résultats de
+        l'étude étaient surprenants et ils devraient nous faire réfléchir à notre manière de travailler.
+    """,
+    "de": """
+        Hallo zusammen und willkommen zurück auf dem Kanal. Heute sprechen wir darüber, wie das Gehirn
+        neue Dinge lernt und warum der Schlaf für das Gedächtnis so wichtig ist. Wenn du dich schon
+        einmal gefragt hast, was passiert, wenn du spät in der Nacht lernst, dann ist dieses Video für
+        dich. Also fangen wir mit der ersten Frage an: Was ist eigentlich eine Erinnerung? Wenn du
+        etwas lernst, verändern sich die Verbindungen zwischen deinen Nervenzellen, und diese
+        Veränderungen brauchen Zeit, um stabil zu werden. Deshalb erinnern sich Menschen, die gut
+        schlafen, meistens besser an das, was sie am Vortag gelernt haben. Vergiss nicht, den Kanal zu
+        abonnieren und unten einen Kommentar zu schreiben, wenn du Fragen zu diesem Thema hast. Die
+        Ergebnisse der Studie waren überraschend und sollten uns über unsere Arbeitsweise nachdenken lassen.
+    """,
+    "it": """
+        Ciao a tutti e bentornati sul canale. Oggi parleremo di come il cervello impara cose nuove e
+        del perché il sonno è così importante per la memoria. Se vi siete mai chiesti cosa succede
+        quando studiate fino a tarda notte, questo video fa per voi. Allora cominciamo con la prima
+        domanda: che cos'è davvero un ricordo? Quando imparate qualcosa, le connessioni tra i vostri
+        neuroni cambiano, e questi cambiamenti hanno bisogno di tempo per diventare stabili. Ecco
+        perché le persone che dormono bene di solito ricordano di più quello che hanno studiato il
+        giorno prima. Non dimenticate di iscrivervi e di lasciare un commento qui sotto se avete delle
+        domande su questo argomento. I risultati dello studio sono stati sorprendenti e dovrebbero
+        farci riflettere sul modo in cui lavoriamo. Penso che sia una delle cose più interessanti.
+    """,
+    "pt": """
+        Olá a todos e bem-vindos de volta ao canal. Hoje nós vamos falar sobre como o cérebro aprende
+        coisas novas e por que o sono é tão importante para a memória. Se você já se perguntou o que
+        acontece quando estuda até tarde da noite, este vídeo é para você. Então vamos começar com a
+        primeira pergunta: o que é realmente uma lembrança? Quando você aprende alguma coisa, as
+        conexões entre os seus neurônios mudam, e essas mudanças precisam de tempo para ficarem
+        estáveis. É por isso que as pessoas que dormem bem normalmente se lembram mais do que
+        estudaram no dia anterior. Não se esqueça de se inscrever e deixar um comentário se tiver
+        alguma dúvida sobre esse assunto. Os resultados do estudo foram surpreendentes e deveriam nos
+        fazer pensar na maneira como trabalhamos. Acho que essa é uma das coisas mais interessantes.
+    """,
+    "nl": """
+        Hallo allemaal en welkom terug op het kanaal. Vandaag gaan we het hebben over hoe de hersenen
+        nieuwe dingen leren en waarom slaap zo belangrijk is voor het geheugen. Als je je ooit hebt
+        afgevraagd wat er gebeurt als je tot laat in de avond studeert, dan is deze video voor jou.
+        Laten we dus beginnen met de eerste vraag: wat is eigenlijk een herinnering? Wanneer je iets
+        leert, veranderen de verbindingen tussen je zenuwcellen, en die veranderingen hebben tijd nodig
+        om stabiel te worden. Daarom onthouden mensen die goed slapen meestal meer van wat ze de dag
+        ervoor hebben gestudeerd. Vergeet niet je te abonneren en hieronder een reactie achter te laten
+        als je vragen hebt over dit onderwerp. De resultaten van het onderzoek waren verrassend en
+        zouden ons aan het denken moeten zetten over de manier waarop we werken.
+    """,
+    "sv": """
+        Hej allihop och välkomna tillbaka till kanalen. Idag ska vi prata om hur hjärnan lär sig nya
+        saker och varför sömnen är så viktig för minnet. Om du någon gång har undrat vad som händer när
+        du pluggar sent på kvällen så är den här videon för dig. Så låt oss börja med den första
+        frågan: vad är egentligen ett minne? När du lär dig något förändras kopplingarna mellan dina
+        nervceller, och de förändringarna behöver tid för att bli stabila. Det är därför som människor
+        som sover bra oftast kommer ihåg mer av det de läste dagen innan. Glöm inte att prenumerera och
+        skriva en kommentar nedan om du har några frågor om det här ämnet. Resultaten av studien var
+        överraskande och borde få oss att tänka på hur vi arbetar.
+    """,
+    "tr": """
+        Herkese merhaba ve kanala tekrar hoş geldiniz. Bugün beynin yeni şeyleri nasıl öğrendiğinden ve
+        uykunun hafıza için neden bu kadar önemli olduğundan bahsedeceğiz. Gece geç saatlere kadar ders
+        çalıştığınızda ne olduğunu hiç merak ettiyseniz, bu video tam size göre. O halde ilk soruyla
+        başlayalım: bir anı aslında nedir? Bir şey öğrendiğinizde sinir hücreleriniz arasındaki
+        bağlantılar değişir ve bu değişikliklerin kalıcı hale gelmesi için zamana ihtiyaç vardır. Bu
+        yüzden iyi uyuyan insanlar genellikle bir önceki gün çalıştıklarını daha iyi hatırlarlar. Bu
+        konuyla ilgili sorularınız varsa abone olmayı ve aşağıya bir yorum bırakmayı unutmayın.
+        Araştırmanın sonuçları şaşırtıcıydı ve çalışma şeklimiz hakkında bizi düşündürmeli.
+    """,
+    "pl": """
+        Cześć wszystkim i witajcie ponownie na kanale. Dzisiaj porozmawiamy o tym, jak mózg uczy się
+        nowych rzeczy i dlaczego sen jest tak ważny dla pamięci. Jeśli kiedykolwiek zastanawialiście
+        się, co się dzieje, gdy uczycie się późno w nocy, ten film jest dla was. Zacznijmy więc od
+        pierwszego pytania: czym właściwie jest wspomnienie? Kiedy uczycie się czegoś, połączenia
+        między waszymi neuronami się zmieniają, a te zmiany potrzebują czasu, żeby stały się trwałe.
+        Dlatego ludzie, którzy dobrze śpią, zwykle pamiętają więcej z tego, czego uczyli się dzień
+        wcześniej. Nie zapomnijcie zasubskrybować kanału i zostawić komentarza, jeśli macie pytania na
+        ten temat. Wyniki badania były zaskakujące i powinny skłonić nas do zastanowienia się nad tym,
+        jak pracujemy.
+    """,
+    "id": """
+        Halo semuanya dan selamat datang kembali di channel ini. Hari ini kita akan membahas bagaimana
+        otak mempelajari hal-hal baru dan mengapa tidur sangat penting untuk ingatan. Kalau kalian
+        pernah bertanya-tanya apa yang terjadi ketika kalian belajar sampai larut malam, video ini
+        untuk kalian. Jadi mari kita mulai dengan pertanyaan pertama: apa sebenarnya ingatan itu?
+        Ketika kalian mempelajari sesuatu, hubungan antara sel-sel saraf kalian berubah, dan perubahan
+        itu membutuhkan waktu untuk menjadi stabil. Itulah sebabnya orang yang tidur dengan baik
+        biasanya lebih banyak mengingat apa yang mereka pelajari sehari sebelumnya. Jangan lupa untuk
+        berlangganan dan tinggalkan komentar di bawah jika ada pertanyaan tentang topik ini. Hasil
+        penelitian itu mengejutkan dan seharusnya membuat kita memikirkan cara kita bekerja.
+    """,
+    "vi": """
+        Xin chào tất cả mọi người và chào mừng các bạn quay trở lại với kênh. Hôm nay chúng ta sẽ nói
+        về cách bộ não học những điều mới và tại sao giấc ngủ lại quan trọng đối với trí nhớ. Nếu bạn
+        đã từng tự hỏi điều gì xảy ra khi bạn học bài đến khuya, thì video này là dành cho bạn. Vậy
+        chúng ta hãy bắt đầu với câu hỏi đầu tiên: ký ức thực sự là gì? Khi bạn học một điều gì đó,
+        các kết nối giữa các tế bào thần kinh của bạn thay đổi, và những thay đổi đó cần thời gian để
+        trở nên ổn định. Đó là lý do tại sao những người ngủ ngon thường nhớ được nhiều hơn những gì
+        họ đã học vào ngày hôm trước. Đừng quên đăng ký kênh và để lại bình luận bên dưới nếu bạn có
+        câu hỏi nào về chủ đề này.
+    """,
+    "cs": """
+        Ahoj všichni a vítejte zpátky na kanálu. Dnes si budeme povídat o tom, jak se mozek učí nové
+        věci a proč je spánek pro paměť tak důležitý. Pokud jste se někdy ptali, co se děje, když se
+        učíte pozdě v noci, tohle video je právě pro vás. Takže začněme první otázkou: co to vlastně
+        je vzpomínka? Když se něco naučíte, spojení mezi vašimi neurony se změní a tyto změny
+        potřebují čas, aby se staly stabilními. Proto lidé, kteří dobře spí, si obvykle pamatují víc
+        z toho, co se učili předchozí den. Nezapomeňte se přihlásit k odběru a napsat komentář, pokud
+        máte k tomuto tématu nějaké otázky. Výsledky studie byly překvapivé a měly by nás přimět
+        zamyslet se nad tím, jak pracujeme. Myslím si, že je to jedna z nejzajímavějších věcí, které
+        jsem letos četl. Děkuji za pozornost a uvidíme se v příštím díle.
+    """,
+    "da": """
+        Hej allesammen og velkommen tilbage til kanalen. I dag skal vi tale om, hvordan hjernen lærer
+        nye ting, og hvorfor søvn er så vigtig for hukommelsen. Hvis du nogensinde har undret dig over,
+        hvad der sker, når du læser til sent om aftenen, så er denne video til dig. Så lad os starte
+        med det første spørgsmål: hvad er en erindring egentlig? Når du lærer noget, ændrer
+        forbindelserne mellem dine neuroner sig, og de ændringer har brug for tid til at blive
+        stabile. Det er derfor, at folk der sover godt, som regel husker mere af det, de lærte dagen
+        før. Husk at abonnere og skrive en kommentar nedenfor, hvis du har spørgsmål om dette emne.
+        Resultaterne af undersøgelsen var overraskende, og de burde få os til at tænke over den måde,
+        vi arbejder på. Tak fordi du så med, og vi ses i den næste.
+    """,
+    "fi": """
+        Hei kaikki ja tervetuloa takaisin kanavalle. Tänään puhumme siitä, miten aivot oppivat uusia
+        asioita ja miksi uni on niin tärkeää muistille. Jos olet joskus miettinyt, mitä tapahtuu kun
+        opiskelet myöhään illalla, tämä video on sinua varten. Aloitetaan siis ensimmäisestä
+        kysymyksestä: mikä muisto oikeastaan on? Kun opit jotain, hermosolujesi väliset yhteydet
+        muuttuvat, ja nämä muutokset tarvitsevat aikaa vakiintuakseen. Siksi hyvin nukkuvat ihmiset
+        muistavat yleensä enemmän siitä, mitä he opiskelivat edellisenä päivänä. Muista tilata kanava
+        ja jättää kommentti alle, jos sinulla on kysyttävää tästä aiheesta. Tutkimuksen tulokset
+        olivat yllättäviä, ja niiden pitäisi saada meidät miettimään tapaa, jolla teemme töitä.
+        Kiitos katsomisesta, ja nähdään seuraavassa jaksossa.
+    """,
+}
+
+
+def trigrams(text: str):
+    # same normalization as app._langid_trigrams
+    text = re.sub(r"[^\w']+", " ", text.lower())
+    text = re.sub(r"[\d_]+", " ", text)
+    out = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            out[padded[i:i + 3]] += 1
+    return out
+
+
+def build():
+    profiles = {}
+    floors = {}
+    for lang, sample in SAMPLES.items():
+        counts = trigrams(sample)
+        total = sum(counts.values())
+        vocab = len(counts)
+        # add-one smoothing; unseen trigrams score the smoothed floor
+        denom = total + vocab + 1
+        profiles[lang] = {g: round(math.log((c + 1) / denom), 3) for g, c in counts.most_common(TOP_N)}
+        floors[lang] = round(math.log(1 / denom), 3)
+    return {"version": 1, "ngram": 3, "floors": floors, "profiles": profiles}
+
+
+if __name__ == "__main__":
+    out = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_model.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(build(), f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    print("wrote", out)
@@ -0,0 +1,17 @@
+"""
+Page text extraction for the PDF process pool in app.py.
+
+Kept apart from app.py because the pool uses spawn: a child unpickles the
+task function by importing its module, and this one only needs PyMuPDF,
+not the Flask app, its caches and background threads.
+"""
+import fitz  # PyMuPDF
+
+
+def extract_pages(path: str, page_numbers):
+    """Text of the given pages of the PDF at `path`; runs in the extraction process pool."""
+    doc = fitz.open(path)
+    try:
+        return [doc[i].get_text() for i in page_numbers]
+    finally:
+        doc.close()
@@ -44,28 +44,75 @@ async function fetchVideoTitle(videoUrl) {
   }
 }
 
-// Function to perform summarization
+// Function to render a streamed progress event from the backend
+function handleSummaryEvent(evt, partials) {
+  const statusEl = document.getElementById("status");
+  const summaryOutput = document.getElementById("summaryOutput");
+  const data = evt.data || {};
+  if (evt.event === "transcript") {
+    statusEl.textContent = `Transcript fetched (${data.segments} segments, ${data.language || "unknown"}). Summarizing...`;
+  } else if (evt.event === "chunk") {
+    if (data.summary) partials[data.index] = data.summary;
+    const done = Object.keys(partials).length;
+    statusEl.textContent = `Summarizing... ${done}/${data.total} parts done`;
+    summaryOutput.textContent = Object.keys(partials)
+      .sort((a, b) => a - b)
+      .map((k) => partials[k])
+      .join("\n\n");
+  } else if (evt.event === "reduce") {
+    statusEl.textContent = "Combining partial summaries...";
+  } else if (evt.event === "summary") {
+    summaryOutput.textContent = data.summary || "";
+    statusEl.textContent = "✅ Summary generated!";
+  } else if (evt.event === "error") {
+    statusEl.textContent = `⚠️ ${data.error}`;
+    summaryOutput.textContent = data.detail || "";
+  }
+}
+
+// Function to perform summarization (streams partial results as they arrive)
 async function performSummarization(videoUrl) {
   const statusEl = document.getElementById("status");
   const summaryOutput = document.getElementById("summaryOutput");
   summaryOutput.textContent = "";
   statusEl.textContent = "Summarizing... (please wait)";
   try {
-    const res = await fetch("http://127.0.0.1:5000/summarize/youtube", {
+    const res = await fetch("http://127.0.0.1:5000/summarize/youtube?stream=ndjson", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ video_url: videoUrl }),
     });
 
-    const data = await res.json();
-    if (data.summary) {
-      summaryOutput.textContent = data.summary;
-      statusEl.textContent = "✅ Summary generated!";
-    } else if (data.error) {
-      statusEl.textContent = `⚠️ ${data.error}`;
-      summaryOutput.textContent = data.detail || "";
-    } else {
-      statusEl.textContent = "⚠️ Unknown response.";
+    const contentType = res.headers.get("Content-Type") || "";
+    if (!contentType.includes("ndjson") || !res.body) {
+      // validation errors are plain JSON
+      const data = await res.json();
+      if (data.summary) {
+        summaryOutput.textContent = data.summary;
+        statusEl.textContent = "✅ Summary generated!";
+      } else if (data.error) {
+        statusEl.textContent = `⚠️ ${data.error}`;
+        summaryOutput.textContent = data.detail || "";
+      } else {
+        statusEl.textContent = "⚠️ Unknown response.";
+      }
+      return;
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    const partials = {};
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline;
+      while ((newline = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (line) handleSummaryEvent(JSON.parse(line), partials);
+      }
     }
   } catch (err) {
     console.error(err);